@@ -1,6 +1,13 @@
 import openai
 import json
 import os
+import queue
+import random
+import threading
+import time
+
+from categories import prompt_section
+from example_index import ExampleIndex, load_past_examples
 
 # =============================================================================
 # CONFIGURATION - Load API key from api_config.json or environment variable
@@ -8,8 +15,10 @@ import os
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 V1_DIR = os.path.dirname(SCRIPT_DIR)
 CONFIG_FILE = os.path.join(V1_DIR, "APIs", "api_config.json")
+LOG_DIR = os.path.join(V1_DIR, "log")   # run logs: past prompts with their parsed operations
 
 OPENAI_API_KEY = None
+config = {}
 
 # Try loading from config file first
 if os.path.isfile(CONFIG_FILE):
@@ -24,12 +33,43 @@ if not OPENAI_API_KEY:
 if not OPENAI_API_KEY or OPENAI_API_KEY == "your-openai-api-key-here":
     raise ValueError("Please set your OpenAI API key in api_config.json or OPENAI_API_KEY environment variable")
 
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# =============================================================================
+# TRANSPORT - Timeouts, retries and hedging for the completion call
+# Any value can be overridden from the "PARSER_TRANSPORT" block of api_config.json
+# =============================================================================
+transport = config.get("PARSER_TRANSPORT", {})
+
+MODEL = transport.get("MODEL", "gpt-5.2")
+CONNECT_TIMEOUT = float(transport.get("CONNECT_TIMEOUT", 5.0))   # seconds to open the connection
+READ_TIMEOUT = float(transport.get("READ_TIMEOUT", 45.0))        # seconds to wait for the completion
+MAX_ATTEMPTS = int(transport.get("MAX_ATTEMPTS", 3))             # first try + retries
+BACKOFF_BASE = float(transport.get("BACKOFF_BASE", 0.5))         # seconds, doubled per retry
+BACKOFF_CAP = float(transport.get("BACKOFF_CAP", 8.0))           # upper bound for a single wait
+HEDGE_AFTER = transport.get("HEDGE_AFTER")                       # seconds before a hedged duplicate, None = off
+
+# Errors worth retrying: the request may well succeed on a second try
+TRANSIENT_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+# Retries are handled here (with jitter and latency logging), not by the SDK
+client = openai.OpenAI(
+    api_key=OPENAI_API_KEY,
+    timeout=openai.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+    max_retries=0,
+)
 
 # =============================================================================
 # SYSTEM PROMPT FOR THE AI AGENT
+# Base instructions plus the FEW_SHOT_K examples most similar to the request,
+# retrieved from past successful runs and the built-in examples below
 # =============================================================================
-SYSTEM_PROMPT = """You are a parser that converts natural language requests about structural columns into a JSON format.
+FEW_SHOT_K = int(config.get("FEW_SHOT_K", 4))
+
+BASE_PROMPT = """You are a parser that converts natural language requests about structural columns into a JSON format.
 
 The columns have these properties:
 - alpha_grid: Letters A through F (grid lines)
@@ -47,71 +87,226 @@ Query syntax:
 - "alpha": "B", "B-D" (single or range)
 - "numeric": "2", "2-4" (single or range)
 - "type": "RC sq" or "SC"
-- "size": "500mm"
+- "size": "500mm" (exact size)
+- "width", "depth": section dimensions in mm, compared like levels: "<450", ">=600", "400-600".
+  A square size "500mm" has width and depth 500; steel sizes "356x368x177" are depth x width x mass.
+- "mass": steel mass per metre in kg/m, e.g. "<118" (only steel sizes have one)
+Use width/depth/mass for "smaller than", "at least", "lighter than" instead of listing sizes.
 
 Change syntax:
 - "size": "600mm" (string with mm unit)
 - "type": "RC sq" or "SC"
 
-Examples:
+Other element categories: operations on them carry a "category" key (omit it for columns).
+""" + prompt_section() + """
 
-Input: "all columns above level 5"
-Output: {"operations": [{"query": {"level": ">5"}, "change": {}}]}
-
-Input: "all columns that are RC sq"
-Output: {"operations": [{"query": {"type": "RC sq"}, "change": {}}]}
-
-Input: "all columns between grids B and D, and above level 5 should change to 400mm RC sq"
-Output: {"operations": [{"query": {"alpha": "B-D", "level": ">5"}, "change": {"size": "400mm", "type": "RC sq"}}]}
-
-Input: "change all columns at level 3 to 600mm"
-Output: {"operations": [{"query": {"level": "3"}, "change": {"size": "600mm"}}]}
-
-Input: "columns C2 to E4, levels 0-3, change to SC 300mm"
-Output: {"operations": [{"query": {"alpha": "C-E", "numeric": "2-4", "level": "0-3"}, "change": {"type": "SC", "size": "300mm"}}]}
+Examples:
 
-Input: "for all columns B to E and 2 to 4, make those with base_level L0 to L4 600mm, base_level L5 to L7 450mm, and the levels above that should be 400mm"
-Output: {"operations": [{"query": {"alpha": "B-E", "numeric": "2-4", "level": "0-4"}, "change": {"size": "600mm"}}, {"query": {"alpha": "B-E", "numeric": "2-4", "level": "5-7"}, "change": {"size": "450mm"}}, {"query": {"alpha": "B-E", "numeric": "2-4", "level": ">7"}, "change": {"size": "400mm"}}]}
+{examples}
 
 IMPORTANT: Output ONLY the JSON object, no explanation or other text.
 IMPORTANT: For multi-part requests with different conditions, return multiple operations in the array.
 IMPORTANT: Size must be a STRING with mm unit, e.g. "600mm" not 600."""
 
+# Built-in examples: the fallback when there is little history, and
+# candidates for retrieval like any past run
+EXAMPLES = [
+    ("all columns above level 5",
+     [{"query": {"level": ">5"}, "change": {}}]),
+    ("all columns that are RC sq",
+     [{"query": {"type": "RC sq"}, "change": {}}]),
+    ("all columns between grids B and D, and above level 5 should change to 400mm RC sq",
+     [{"query": {"alpha": "B-D", "level": ">5"}, "change": {"size": "400mm", "type": "RC sq"}}]),
+    ("change all columns at level 3 to 600mm",
+     [{"query": {"level": "3"}, "change": {"size": "600mm"}}]),
+    ("columns C2 to E4, levels 0-3, change to SC 300mm",
+     [{"query": {"alpha": "C-E", "numeric": "2-4", "level": "0-3"}, "change": {"type": "SC", "size": "300mm"}}]),
+    ("columns smaller than 450mm should be 450mm",
+     [{"query": {"width": "<450"}, "change": {"size": "450mm"}}]),
+    ("SC columns lighter than 118 kg/m above level 4",
+     [{"query": {"type": "SC", "mass": "<118", "level": ">4"}, "change": {}}]),
+    ("resize columns above level 5 to 600mm and change the beams on level 5 to UB 457x191x98",
+     [{"query": {"level": ">5"}, "change": {"size": "600mm"}},
+      {"category": "beams", "query": {"level": "5"}, "change": {"type": "UB", "size": "457x191x98"}}]),
+    ("for all columns B to E and 2 to 4, make those with base_level L0 to L4 600mm, "
+     "base_level L5 to L7 450mm, and the levels above that should be 400mm",
+     [{"query": {"alpha": "B-E", "numeric": "2-4", "level": "0-4"}, "change": {"size": "600mm"}},
+      {"query": {"alpha": "B-E", "numeric": "2-4", "level": "5-7"}, "change": {"size": "450mm"}},
+      {"query": {"alpha": "B-E", "numeric": "2-4", "level": ">7"}, "change": {"size": "400mm"}}]),
+]
 
-def parse_request(user_input: str) -> dict:
-    """
-    Parse natural language into query and change dictionaries using OpenAI.
+_example_index = None
 
-    Args:
-        user_input: Natural language request about columns
+
+def select_examples(user_input: str, k: int = FEW_SHOT_K) -> list:
+    """
+    The k examples most similar to user_input (TF-IDF over past successful
+    runs and EXAMPLES), topped up with built-in examples if fewer match.
 
     Returns:
-        Dictionary with "query" and "change" keys
+        List of (prompt, operations, score)
     """
+    global _example_index
+    if _example_index is None:
+        _example_index = ExampleIndex(load_past_examples(LOG_DIR) + EXAMPLES)
+
+    selected = _example_index.top(user_input, k)
+    chosen = {text for text, _, _ in selected}
+    for text, ops in EXAMPLES:
+        if len(selected) >= k:
+            break
+        if text not in chosen:
+            selected.append((text, ops, 0.0))
+    return selected
+
+
+def build_system_prompt(examples: list) -> str:
+    """BASE_PROMPT with the given (prompt, operations, score) examples filled in."""
+    blocks = ['Input: "{}"\nOutput: {}'.format(text, json.dumps({"operations": ops}))
+              for text, ops, _ in examples]
+    return BASE_PROMPT.replace("{examples}", "\n\n".join(blocks))
+
+
+def _parse_response_text(result_text: str) -> dict:
+    """Decode the model output, tolerating a markdown code block wrapper."""
+    result_text = result_text.strip()
+
+    # Clean up if wrapped in markdown code block
+    if result_text.startswith("```"):
+        result_text = result_text.split("```")[1]
+        if result_text.startswith("json"):
+            result_text = result_text[4:]
+        result_text = result_text.strip()
+
+    result = json.loads(result_text)
+    if not isinstance(result, dict) or "operations" not in result:
+        raise ValueError(f"Parser response has no operations: {result_text[:200]}")
+    return result
+
+
+def _timed_attempt(user_input: str, system_prompt: str, label: str, attempts: list) -> dict:
+    """Run a single completion call and record its latency in attempts."""
+    start = time.perf_counter()
     try:
         response = client.chat.completions.create(
-            model="gpt-5.2",
+            model=MODEL,
             messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_input}
             ],
             temperature=0
         )
+        result = _parse_response_text(response.choices[0].message.content)
+    except Exception as e:
+        elapsed = time.perf_counter() - start
+        attempts.append({"attempt": label, "latency": round(elapsed, 3), "ok": False,
+                         "error": f"{type(e).__name__}: {e}"})
+        print(f"Parser attempt {label}: failed after {elapsed:.2f}s ({type(e).__name__})")
+        raise
 
-        result_text = response.choices[0].message.content.strip()
+    elapsed = time.perf_counter() - start
+    attempts.append({"attempt": label, "latency": round(elapsed, 3), "ok": True})
+    print(f"Parser attempt {label}: ok in {elapsed:.2f}s")
+    return result
 
-        # Clean up if wrapped in markdown code block
-        if result_text.startswith("```"):
-            result_text = result_text.split("```")[1]
-            if result_text.startswith("json"):
-                result_text = result_text[4:]
-            result_text = result_text.strip()
 
-        return json.loads(result_text)
+def _start_attempt(results: queue.Queue, user_input: str, system_prompt: str, label: str, attempts: list):
+    """
+    Run _timed_attempt on a daemon thread and put (ok, result or error) on
+    results. A losing request can't be cancelled once sent; as a daemon it
+    doesn't keep the process alive until it times out.
+    """
+    def run():
+        try:
+            results.put((True, _timed_attempt(user_input, system_prompt, label, attempts)))
+        except Exception as e:
+            results.put((False, e))
+    threading.Thread(target=run, name=f"parser-{label}", daemon=True).start()
+
+
+def _record_pending(attempts: list, started: dict):
+    """
+    Log the requests still running when the winner returned, with their
+    latency so far; they finish after parse_request has copied the log.
+    """
+    done = {a["attempt"] for a in list(attempts)}
+    now = time.perf_counter()
+    for label, start in started.items():
+        if label not in done:
+            attempts.append({"attempt": label, "latency": round(now - start, 3), "ok": None,
+                             "pending": True})
+
+
+def _hedged_attempt(user_input: str, system_prompt: str, attempt: int, attempts: list) -> dict:
+    """
+    Run one attempt. If HEDGE_AFTER is set and the first request is still
+    pending after that many seconds, fire a duplicate; the first valid answer wins.
+    """
+    if not HEDGE_AFTER:
+        return _timed_attempt(user_input, system_prompt, str(attempt), attempts)
+
+    results = queue.Queue()
+    started = {str(attempt): time.perf_counter()}
+    _start_attempt(results, user_input, system_prompt, str(attempt), attempts)
+    running = 1
+    try:
+        outcome = results.get(timeout=float(HEDGE_AFTER))
+    except queue.Empty:
+        print(f"Parser attempt {attempt}: no answer after {HEDGE_AFTER}s, sending hedged request")
+        started[f"{attempt}h"] = time.perf_counter()
+        _start_attempt(results, user_input, system_prompt, f"{attempt}h", attempts)
+        running += 1
+        outcome = results.get()
+
+    while True:
+        running -= 1
+        ok, value = outcome
+        if ok:
+            _record_pending(attempts, started)
+            return value
+        if not running:
+            raise value
+        outcome = results.get()
+
+
+def parse_request(user_input: str) -> dict:
+    """
+    Parse natural language into query and change dictionaries using OpenAI.
+
+    Transient failures (timeouts, connection errors, rate limits, 5xx) are
+    retried up to MAX_ATTEMPTS times with jittered exponential backoff.
+
+    Args:
+        user_input: Natural language request about columns
+
+    Returns:
+        Dictionary with "operations", "attempts" (per-attempt latency log) and
+        "examples" (the few-shot examples used, with their similarity)
+    """
+    attempts = []
+    examples = select_examples(user_input)
+    system_prompt = build_system_prompt(examples)
+    used = [{"input": text, "score": score} for text, _, score in examples]
+    try:
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                result = _hedged_attempt(user_input, system_prompt, attempt, attempts)
+                break
+            except TRANSIENT_ERRORS as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                # Full jitter: spread retries so parallel runs don't stampede
+                delay = random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** (attempt - 1)))
+                print(f"Transient parser error ({type(e).__name__}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+        result["attempts"] = list(attempts)
+        result["examples"] = used
+        return result
 
     except Exception as e:
         print(f"Error in AI parsing: {e}")
-        return {"operations": [], "error": str(e)}
+        return {"operations": [], "error": str(e), "attempts": list(attempts), "examples": used}
 
 
 # =============================================================================
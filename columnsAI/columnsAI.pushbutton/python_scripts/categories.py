@@ -0,0 +1,241 @@
+"""
+Element categories known to the pipeline and the Revit sync.
+
+Each category defines its table (CSV schema and id format), the query and
+change keys the parser may use on it, the fields checked against the model
+manifest, and how the pyRevit side places its elements. Parsed operations
+name their category ("category": "beams"); operations without one are
+column operations.
+
+Imported by the pipeline (CPython 3) and by the pyRevit sync (IronPython 2.7),
+so this module stays plain Python without f-strings or third-party imports.
+"""
+import string
+
+# Query kinds (see run_pipeline.get_filter_mask):
+#   "level"  - level names like L5 compared by number: "5", ">5", "<=3", "2-5"
+#   "number" - integer field, same comparisons as "level"
+#   "alpha"  - text field, single value or inclusive range "B-D"
+#   "value"  - exact match
+#   "dimension" - section dimension named by the query key (width, depth in
+#              mm, mass in kg/m) parsed from a size field (size_index.py),
+#              same comparisons as "number": "<450", ">=600", "300-500"
+LEVEL = "level"
+NUMBER = "number"
+ALPHA = "alpha"
+VALUE = "value"
+DIMENSION = "dimension"
+
+
+class Category(object):
+    """
+    One element category.
+
+    Args:
+        name: Registry key, also the "category" value of parsed operations
+        table: Table CSV file name (next to run_pipeline.py)
+        id_field: Unique id column, stored in the Revit Mark parameter
+        id_format: Template building the id from other fields
+        fields: Table schema (the Revit element_id / unique_id come on top)
+        query_fields: Query key -> (field, kind)
+        change_fields: Change key -> field
+        level_fields: Fields holding Revit level names
+        grid_fields: Fields holding Revit grid names
+        family_field: Field holding the Revit family name (None for walls)
+        type_field: Field holding the Revit type name
+        category_fields: Low-cardinality text fields loaded as categoricals
+        numeric_fields: Integer fields (numeric grids)
+        revit_category: BuiltInCategory member name
+        placement: How the sync places an element: "column" (columns.py),
+                   "point" (at a grid intersection), "line" (along a grid
+                   between two crossing grids) or "wall" (like "line", with
+                   a wall type and base/top levels)
+        point_fields: (grid, grid) intersected for "column" / "point"
+        line_fields: (along, start, end) grids for "line" / "wall"
+        manifest_types: Manifest key listing this category's (family, type)
+                        pairs, or None if the manifest does not export them
+        description: One line for the parser prompt
+    """
+
+    def __init__(self, name, table, id_field, id_format, fields, query_fields,
+                 change_fields, level_fields, grid_fields, family_field, type_field,
+                 category_fields, numeric_fields, revit_category, placement,
+                 point_fields=None, line_fields=None, manifest_types=None, description=""):
+        self.name = name
+        self.table = table
+        self.id_field = id_field
+        self.id_format = id_format
+        self.fields = fields
+        self.query_fields = query_fields
+        self.change_fields = change_fields
+        self.level_fields = level_fields
+        self.grid_fields = grid_fields
+        self.family_field = family_field
+        self.type_field = type_field
+        self.category_fields = category_fields
+        self.numeric_fields = numeric_fields
+        self.revit_category = revit_category
+        self.placement = placement
+        self.point_fields = point_fields
+        self.line_fields = line_fields
+        self.manifest_types = manifest_types
+        self.description = description
+
+    @property
+    def key_fields(self):
+        """Fields the id is built from, in template order."""
+        return [field for _, field, _, _ in string.Formatter().parse(self.id_format) if field]
+
+    def __repr__(self):
+        return "Category({!r})".format(self.name)
+
+
+DEFAULT_CATEGORY = "columns"
+
+CATEGORIES = {}
+
+
+def register(category):
+    """Add a category to the registry (replacing one with the same name)."""
+    CATEGORIES[category.name] = category
+    return category
+
+
+def get_category(name=None):
+    """Category by name (or a Category); None means columns. Raises ValueError for unknown names."""
+    if isinstance(name, Category):
+        return name
+    key = (name or DEFAULT_CATEGORY).strip().lower()
+    if key not in CATEGORIES:
+        raise ValueError("Unknown category: {} (known: {})".format(name, ", ".join(sorted(CATEGORIES))))
+    return CATEGORIES[key]
+
+
+def category_of(op):
+    """Category name of a parsed operation."""
+    return get_category(op.get("category")).name
+
+
+register(Category(
+    name="columns",
+    table="columns.csv",
+    id_field="column_id",
+    id_format="{alpha_grid}{numeric_grid}-{base_level}{top_level}",
+    fields=["column_id", "base_level", "top_level", "alpha_grid", "numeric_grid", "column_type", "size"],
+    query_fields={
+        "level": ("base_level", LEVEL),
+        "alpha": ("alpha_grid", ALPHA),
+        "numeric": ("numeric_grid", NUMBER),
+        "type": ("column_type", VALUE),
+        "size": ("size", VALUE),
+        "width": ("size", DIMENSION),
+        "depth": ("size", DIMENSION),
+        "mass": ("size", DIMENSION),
+    },
+    change_fields={"size": "size", "type": "column_type"},
+    level_fields=["base_level", "top_level"],
+    grid_fields=["alpha_grid", "numeric_grid"],
+    family_field="column_type",
+    type_field="size",
+    category_fields=["column_type", "size", "base_level", "top_level", "alpha_grid"],
+    numeric_fields=["numeric_grid"],
+    revit_category="OST_StructuralColumns",
+    placement="column",
+    point_fields=("alpha_grid", "numeric_grid"),
+    manifest_types="types",
+    description="structural columns at grid intersections (the default)",
+))
+
+register(Category(
+    name="foundations",
+    table="foundations.csv",
+    id_field="foundation_id",
+    id_format="{alpha_grid}{numeric_grid}-{level}",
+    fields=["foundation_id", "level", "alpha_grid", "numeric_grid", "foundation_type", "size"],
+    query_fields={
+        "level": ("level", LEVEL),
+        "alpha": ("alpha_grid", ALPHA),
+        "numeric": ("numeric_grid", NUMBER),
+        "type": ("foundation_type", VALUE),
+        "size": ("size", VALUE),
+        "width": ("size", DIMENSION),
+        "depth": ("size", DIMENSION),
+        "mass": ("size", DIMENSION),
+    },
+    change_fields={"size": "size", "type": "foundation_type"},
+    level_fields=["level"],
+    grid_fields=["alpha_grid", "numeric_grid"],
+    family_field="foundation_type",
+    type_field="size",
+    category_fields=["foundation_type", "size", "level", "alpha_grid"],
+    numeric_fields=["numeric_grid"],
+    revit_category="OST_StructuralFoundation",
+    placement="point",
+    point_fields=("alpha_grid", "numeric_grid"),
+    description="isolated pad foundations at grid intersections",
+))
+
+register(Category(
+    name="beams",
+    table="beams.csv",
+    id_field="beam_id",
+    id_format="{grid}:{start_grid}-{end_grid}-{level}",
+    fields=["beam_id", "level", "grid", "start_grid", "end_grid", "beam_type", "size"],
+    query_fields={
+        "level": ("level", LEVEL),
+        "grid": ("grid", VALUE),
+        "type": ("beam_type", VALUE),
+        "size": ("size", VALUE),
+        "width": ("size", DIMENSION),
+        "depth": ("size", DIMENSION),
+        "mass": ("size", DIMENSION),
+    },
+    change_fields={"size": "size", "type": "beam_type"},
+    level_fields=["level"],
+    grid_fields=["grid", "start_grid", "end_grid"],
+    family_field="beam_type",
+    type_field="size",
+    category_fields=["beam_type", "size", "level", "grid", "start_grid", "end_grid"],
+    numeric_fields=[],
+    revit_category="OST_StructuralFraming",
+    placement="line",
+    line_fields=("grid", "start_grid", "end_grid"),
+    description="structural beams along a grid line, between two crossing grids",
+))
+
+register(Category(
+    name="walls",
+    table="walls.csv",
+    id_field="wall_id",
+    id_format="{grid}:{start_grid}-{end_grid}-{base_level}{top_level}",
+    fields=["wall_id", "base_level", "top_level", "grid", "start_grid", "end_grid", "wall_type"],
+    query_fields={
+        "level": ("base_level", LEVEL),
+        "grid": ("grid", VALUE),
+        "type": ("wall_type", VALUE),
+    },
+    change_fields={"type": "wall_type"},
+    level_fields=["base_level", "top_level"],
+    grid_fields=["grid", "start_grid", "end_grid"],
+    family_field=None,
+    type_field="wall_type",
+    category_fields=["wall_type", "base_level", "top_level", "grid", "start_grid", "end_grid"],
+    numeric_fields=[],
+    revit_category="OST_Walls",
+    placement="wall",
+    line_fields=("grid", "start_grid", "end_grid"),
+    description="walls along a grid line, between two crossing grids; type is the wall type name",
+))
+
+
+def prompt_section():
+    """Parser prompt lines describing the categories other than columns."""
+    lines = []
+    for name in sorted(CATEGORIES):
+        if name == DEFAULT_CATEGORY:
+            continue
+        category = CATEGORIES[name]
+        lines.append('- "{}": {}. Query keys: {}. Change keys: {}.'.format(
+            name, category.description,
+            ", ".join(sorted(category.query_fields)), ", ".join(sorted(category.change_fields))))
+    return "\n".join(lines)
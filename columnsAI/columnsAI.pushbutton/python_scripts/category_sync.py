@@ -0,0 +1,236 @@
+# pyRevit category_sync.py - Sync pipeline payloads of several element categories
+# Each payload holds the changed rows of one category's table (see categories.py).
+# All of them are synced inside one TransactionGroup: one undo step, and a
+# single keep / roll back choice if anything is interrupted.
+# - columns go through columns.sync_rows
+# - foundations, beams and walls go through ElementAdapter below
+#
+# Importable module: script.py calls sync_payloads(doc, payloads).
+
+from pyrevit import DB
+
+from categories import get_category
+from columns import (get_cache, grid_intersection_point, new_stats, run_chunks, finish_group,
+                     sync_rows, _id_value, _mark_of, _parse_element_id, _row_point, _skip,
+                     _symbol_key, CHUNK_SIZE)
+
+# ----------------- adapters -----------------
+class ElementAdapter(object):
+    """
+    Creates and updates the elements of one non-column category from table
+    rows. The category's types and its existing elements (by Mark) are read
+    in one collector pass; levels and grids come from the session cache.
+    """
+
+    def __init__(self, doc, category):
+        self.doc = doc
+        self.category = category
+        self.bic = getattr(DB.BuiltInCategory, category.revit_category)
+        self.cache = get_cache(doc)
+        self.cache.refresh()
+        self.types = {}
+        self.by_mark = {}
+        for element in DB.FilteredElementCollector(self.doc).OfCategory(self.bic):
+            if isinstance(element, DB.ElementType):
+                key = self._type_key(element)
+                if key:
+                    self.types[key] = element
+            else:
+                mark = _mark_of(element)
+                if mark:
+                    self.by_mark[mark] = element
+
+    def _type_key(self, element_type):
+        """(family_lower, type_lower); walls have no family, only a type name"""
+        if self.category.family_field is None:
+            name = (DB.Element.Name.GetValue(element_type) or "").strip().lower()
+            return ("", name) if name else None
+        return _symbol_key(element_type)
+
+    def _text(self, r, field):
+        return str(r.get(field) or "").strip() if field else ""
+
+    def find_type(self, r):
+        c = self.category
+        return self.types.get((self._text(r, c.family_field).lower(), self._text(r, c.type_field).lower()))
+
+    def resolve(self, r, mark, stats):
+        """Existing element for a row: stored ElementId first (verified by Mark), then Mark."""
+        eid = _parse_element_id(r.get("element_id"))
+        if eid is not None:
+            element = self.doc.GetElement(DB.ElementId(eid))
+            if (element is not None and element.Category is not None
+                    and _id_value(element.Category.Id) == int(self.bic) and _mark_of(element) == mark):
+                stats["id_hits"] += 1
+                return element
+            stats["id_stale"] += 1
+        return self.by_mark.get(mark)
+
+    def _line(self, r, z):
+        """Line along one grid between its crossings with two others, at height z"""
+        grids = [self.cache.grids.get(self._text(r, f)) for f in self.category.line_fields]
+        if not all(grids):
+            return None, "grid not found"
+        along, start, end = grids
+        p0 = grid_intersection_point(along, start)
+        p1 = grid_intersection_point(along, end)
+        if p0 is None or p1 is None:
+            return None, "grid intersection failed"
+        if p0.DistanceTo(p1) < 1e-6:
+            return None, "zero length"
+        return DB.Line.CreateBound(DB.XYZ(p0.X, p0.Y, z), DB.XYZ(p1.X, p1.Y, z)), None
+
+    def _point(self, r, use_points):
+        pt = _row_point(r) if use_points else None
+        if pt is not None:
+            return pt, None
+        grids = [self.cache.grids.get(self._text(r, f)) for f in self.category.point_fields]
+        if not all(grids):
+            return None, "grid not found"
+        pt = grid_intersection_point(grids[0], grids[1])
+        return pt, None if pt is not None else "grid intersection failed"
+
+    def _set_wall_levels(self, wall, base, top):
+        p_base = wall.get_Parameter(DB.BuiltInParameter.WALL_BASE_CONSTRAINT)
+        if p_base and not p_base.IsReadOnly:
+            p_base.Set(base.Id)
+        p_top = wall.get_Parameter(DB.BuiltInParameter.WALL_HEIGHT_TYPE)
+        if p_top and not p_top.IsReadOnly:
+            p_top.Set(top.Id)
+
+    def _create(self, geometry, element_type, levels):
+        placement = self.category.placement
+        if placement == "point":
+            return self.doc.Create.NewFamilyInstance(
+                geometry, element_type, levels[0], DB.Structure.StructuralType.Footing)
+        if placement == "line":
+            return self.doc.Create.NewFamilyInstance(
+                geometry, element_type, levels[0], DB.Structure.StructuralType.Beam)
+        base, top = levels
+        wall = DB.Wall.Create(self.doc, geometry, element_type.Id, base.Id,
+                              top.Elevation - base.Elevation, 0.0, False, True)
+        self._set_wall_levels(wall, base, top)
+        return wall
+
+    def _update(self, element, geometry, element_type, levels):
+        loc = element.Location
+        if isinstance(loc, DB.LocationPoint):
+            loc.Point = geometry
+        elif isinstance(loc, DB.LocationCurve):
+            loc.Curve = geometry
+
+        if self.category.placement == "wall":
+            if element.WallType.Id != element_type.Id:
+                element.WallType = element_type
+            self._set_wall_levels(element, levels[0], levels[1])
+        elif element.Symbol.Id != element_type.Id:
+            element.Symbol = element_type
+
+    def sync_row(self, r, idx, stats, use_points=False):
+        """Create or update the element for one row. Returns its id, or None if skipped."""
+        c = self.category
+        mark = self._text(r, c.id_field)
+        if not mark:
+            _skip(stats, "missing {}".format(c.id_field), "row {}".format(idx + 2))
+            return None
+
+        levels = [self.cache.levels.get(self._text(r, f)) for f in c.level_fields]
+        if not all(levels):
+            _skip(stats, "level not found", mark)
+            return mark
+
+        element_type = self.find_type(r)
+        if element_type is None:
+            _skip(stats, "family/type not found",
+                  " - ".join(self._text(r, f) for f in (c.family_field, c.type_field) if f))
+            return mark
+        if isinstance(element_type, DB.FamilySymbol) and not element_type.IsActive:
+            element_type.Activate()
+            self.doc.Regenerate()
+
+        if c.placement == "point":
+            geometry, problem = self._point(r, use_points)
+        else:
+            geometry, problem = self._line(r, levels[0].Elevation)
+        if problem:
+            _skip(stats, problem, mark)
+            return mark
+
+        element = self.resolve(r, mark, stats)
+        try:
+            if element is None:
+                element = self._create(geometry, element_type, levels)
+                if element is None:
+                    _skip(stats, "failed to create", mark)
+                    return mark
+                p_mark = element.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
+                if p_mark and not p_mark.IsReadOnly:
+                    p_mark.Set(mark)
+                self.by_mark[mark] = element
+                stats["created"] += 1
+            else:
+                self._update(element, geometry, element_type, levels)
+                stats["updated"] += 1
+            stats["ids"][mark] = (str(_id_value(element.Id)), element.UniqueId)
+        except Exception as e:
+            _skip(stats, "sync error", "{}: {}".format(mark, str(e)))
+        return mark
+
+    def sync_rows(self, rows, chunk_size=CHUNK_SIZE, manifest_hash=None):
+        """Sync rows in chunked sub-transactions; the caller owns the TransactionGroup."""
+        if not self.types:
+            raise RuntimeError("No {} types found in project!".format(self.category.name.rstrip("s")))
+        use_points = manifest_hash is not None and manifest_hash == self.cache.manifest_hash
+        stats = new_stats(
+            rows, True,
+            "collected ({} types, {} existing)".format(len(self.types), len(self.by_mark)),
+            self.types,
+            "precomputed" if use_points else "from grids",
+            category=self.category.name, id_field=self.category.id_field)
+
+        def sync_one(r, idx):
+            self.sync_row(r, idx, stats, use_points)
+
+        stats["interrupted"] = run_chunks(self.doc, rows, sync_one, stats, self.category.name, chunk_size)
+        return stats
+
+# ----------------- sync -----------------
+def sync_payloads(doc, payloads, chunk_size=CHUNK_SIZE):
+    """
+    Sync the changed rows of several categories in one TransactionGroup.
+
+    Args:
+        doc: Revit document
+        payloads: Pipeline payloads with "category", "rows" (row dicts) and "manifest_hash"
+        chunk_size: rows per sub-transaction
+
+    Returns:
+        List of (payload, stats) in sync order; stats as for columns.format_report()
+    """
+    results = []
+    group = DB.TransactionGroup(doc, "Sync ColumnsAI Changes")
+    group.Start()
+    try:
+        for payload in payloads:
+            rows = payload["rows"]
+            if not rows:
+                continue
+            category = get_category(payload.get("category"))
+            if category.placement == "column":
+                stats = sync_rows(doc, rows, partial=True, chunk_size=chunk_size,
+                                  manifest_hash=payload.get("manifest_hash"), group=group)
+            else:
+                stats = ElementAdapter(doc, category).sync_rows(
+                    rows, chunk_size=chunk_size, manifest_hash=payload.get("manifest_hash"))
+            results.append((payload, stats))
+            if stats["interrupted"]:
+                break
+
+        finish_group(group, [stats for _, stats in results])
+
+    except Exception:
+        if group.HasStarted():
+            group.RollBack()
+        raise
+
+    return results
@@ -1,43 +1,82 @@
-# pyRevit script.py - Sync Structural Columns from CSV (Robust Version)
+# pyRevit columns.py - Sync Structural Columns from CSV (Robust Version)
 # CSV assumptions:
 # - column_id is unique key (stored in Mark parameter)
 # - column_type = Revit Family name (e.g. "RC sq")
 # - size = Revit Type name inside that family (e.g. "500mm")
 # - base_level / top_level match Revit Level names exactly
 # - alpha_grid / numeric_grid match Revit Grid names exactly
+#
+# Importable module: script.py calls sync_rows(doc, rows). Running this file
+# directly as a pyRevit script asks for a CSV and syncs all of it.
+#
+# Level, grid, column and type lookups are kept in a per-document cache for
+# the whole Revit session and updated from DocumentChanged events, so repeated
+# syncs skip the FilteredElementCollector scans.
 
 from pyrevit import revit, DB, forms
 import csv
+import hashlib
+import json
+import os
 import sys
-
-doc = revit.doc
+import time
 
 DELETE_MISSING = False   # set True to delete columns not in CSV
+CHUNK_SIZE = 200         # rows per sub-transaction inside the sync TransactionGroup
+
+# AppDomain slot holding the session cache (survives pyRevit engine resets).
+# Bump the version whenever ElementCache changes so a reloaded extension
+# does not pick up caches built by older code.
+CACHE_KEY = "ColumnsAI.ElementCache.v5"
+
+# Columns written back to the CSV after a sync so later syncs can skip the Mark scan
+ID_FIELDS = ["element_id", "unique_id"]
 
 # ----------------- helpers -----------------
-def collect_levels():
-    """Collect all levels in the project"""
-    levels = {}
+def _id_value(element_id):
+    """Integer value of an ElementId (Value on Revit 2024+, IntegerValue before)."""
     try:
-        collector = DB.FilteredElementCollector(doc).OfClass(DB.Level)
-        for l in collector:
-            if l and hasattr(l, 'Name'):
-                levels[l.Name.strip()] = l
-    except Exception as e:
-        forms.alert("Error collecting levels: {}".format(str(e)))
-    return levels
+        return element_id.Value
+    except AttributeError:
+        return element_id.IntegerValue
+
+def _is_column_category(element):
+    cat = element.Category
+    return cat is not None and _id_value(cat.Id) == int(DB.BuiltInCategory.OST_StructuralColumns)
+
+def _mark_of(inst):
+    """Mark parameter of an instance, or None"""
+    p = inst.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
+    if p and p.HasValue:
+        return p.AsString() or None
+    return None
 
-def collect_grids():
-    """Collect all grids in the project"""
-    grids = {}
-    try:
-        collector = DB.FilteredElementCollector(doc).OfClass(DB.Grid)
-        for g in collector:
-            if g and hasattr(g, 'Name'):
-                grids[g.Name.strip()] = g
-    except Exception as e:
-        forms.alert("Error collecting grids: {}".format(str(e)))
-    return grids
+def _symbol_name(s):
+    """(family, type) names of a column FamilySymbol as spelled in Revit, or None"""
+    # Get family name via SYMBOL_FAMILY_NAME_PARAM
+    fam_param = s.get_Parameter(DB.BuiltInParameter.SYMBOL_FAMILY_NAME_PARAM)
+    if not fam_param:
+        return None
+    fam = (fam_param.AsString() or "").strip()
+
+    # Get type name via SYMBOL_NAME_PARAM or ALL_MODEL_TYPE_NAME
+    type_param = s.get_Parameter(DB.BuiltInParameter.SYMBOL_NAME_PARAM)
+    if not type_param:
+        type_param = s.get_Parameter(DB.BuiltInParameter.ALL_MODEL_TYPE_NAME)
+    if not type_param:
+        return None
+    name = (type_param.AsString() or "").strip()
+
+    if fam and name:
+        return (fam, name)
+    return None
+
+def _symbol_key(s):
+    """(family_lower, type_lower) for a column FamilySymbol, or None"""
+    names = _symbol_name(s)
+    if names:
+        return (names[0].lower(), names[1].lower())
+    return None
 
 def grid_intersection_point(g1, g2):
     """
@@ -78,65 +117,6 @@ def grid_intersection_point(g1, g2):
     except Exception:
         return None
 
-def existing_columns_by_mark():
-    """Get all existing structural columns indexed by their Mark parameter"""
-    out = {}
-    try:
-        cols = (DB.FilteredElementCollector(doc)
-                .OfCategory(DB.BuiltInCategory.OST_StructuralColumns)
-                .WhereElementIsNotElementType())
-
-        for c in cols:
-            try:
-                # Use built-in Mark parameter (ALL_MODEL_MARK)
-                p = c.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
-                if p and p.HasValue:
-                    mark = p.AsString()
-                    if mark:
-                        out[mark] = c
-            except:
-                continue
-    except Exception as e:
-        forms.alert("Error collecting existing columns: {}".format(str(e)))
-
-    return out
-
-def get_all_column_types():
-    """Get a dict of all available column family types: {(family_lower, type_lower): symbol}"""
-    result = {}
-    try:
-        symbols = (DB.FilteredElementCollector(doc)
-                   .OfCategory(DB.BuiltInCategory.OST_StructuralColumns)
-                   .WhereElementIsElementType()
-                   .ToElements())
-
-        for s in symbols:
-            try:
-                # Get family name via SYMBOL_FAMILY_NAME_PARAM
-                fam_param = s.get_Parameter(DB.BuiltInParameter.SYMBOL_FAMILY_NAME_PARAM)
-                if not fam_param:
-                    continue
-                fam = (fam_param.AsString() or "").strip().lower()
-
-                # Get type name via SYMBOL_NAME_PARAM or ALL_MODEL_TYPE_NAME
-                type_param = s.get_Parameter(DB.BuiltInParameter.SYMBOL_NAME_PARAM)
-                if not type_param:
-                    type_param = s.get_Parameter(DB.BuiltInParameter.ALL_MODEL_TYPE_NAME)
-                if not type_param:
-                    continue
-                name = (type_param.AsString() or "").strip().lower()
-
-                if fam and name:
-                    result[(fam, name)] = s
-
-            except Exception:
-                continue
-
-    except Exception:
-        pass
-
-    return result
-
 def find_symbol_strict(family_name, type_name, type_cache=None):
     """
     Find a FamilySymbol by exact family and type name match.
@@ -172,171 +152,692 @@ def set_base_top_levels(inst, base_level, top_level):
         # Return False but don't crash
         return False
 
-# ----------------- main -----------------
-try:
-    csv_path = forms.pick_file(file_ext="csv", title="Select columns CSV")
-    if not csv_path:
-        forms.alert("No CSV selected.", exitscript=True)
+# ----------------- session cache -----------------
+class ElementCache(object):
+    """
+    Lookup tables for one document: levels, grids, columns by Mark and
+    column types. Built together in one collector pass, then kept current
+    from the added/modified/deleted ids of DocumentChanged events.
+    """
+
+    def __init__(self, doc):
+        self.doc = doc
+        self.levels = {}
+        self.grids = {}
+        self.columns = {}
+        self.types = {}
+        self.loaded = False
+        self.load_note = None       # elements and time of the last full scan, for the sync report
+        self.manifest_hash = None   # hash of the last exported manifest, reset when it goes stale
+        self.export_changes = None  # id value -> ElementId (None if deleted) since the last column export
+        self.export_path = None     # CSV that export is in; export_changes only apply to it
+        self._keys = {}     # element id value -> (table, key)
+        self._dirty = {}    # element id value -> ElementId, added/modified since last use
+
+    def _table(self, name):
+        return getattr(self, name)
+
+    def _classify(self, element):
+        """(table name, key) for an element we track, or None"""
+        if isinstance(element, DB.Level):
+            return ("levels", element.Name.strip())
+        if isinstance(element, DB.Grid):
+            return ("grids", element.Name.strip())
+        if not _is_column_category(element):
+            return None
+        if isinstance(element, DB.FamilySymbol):
+            key = _symbol_key(element)
+            return ("types", key) if key else None
+        if isinstance(element, DB.FamilyInstance):
+            mark = _mark_of(element)
+            return ("columns", mark) if mark else None
+        return None
+
+    def _add(self, table, key, element):
+        if table != "columns":
+            self.manifest_hash = None
+        self._table(table)[key] = element
+        self._keys[_id_value(element.Id)] = (table, key)
+
+    def _drop(self, id_value):
+        entry = self._keys.pop(id_value, None)
+        if entry is None:
+            return
+        table, key = entry
+        if table != "columns":
+            self.manifest_hash = None
+        current = self._table(table).get(key)
+        # Another element may own the key now (e.g. duplicate Marks)
+        if current is not None and _id_value(current.Id) == id_value:
+            del self._table(table)[key]
+
+    def load(self):
+        """
+        Full scan: build every table from scratch in a single collector pass.
+        The quick filters of _tracked_filter() select levels, grids and the
+        column category (types and instances); _classify() sorts them.
+        """
+        t0 = time.time()
+        self.levels = {}
+        self.grids = {}
+        self.columns = {}
+        self.types = {}
+        self.manifest_hash = None
+        self._keys = {}
+        self._dirty = {}
+        count = 0
+        for element in DB.FilteredElementCollector(self.doc).WherePasses(_tracked_filter()):
+            count += 1
+            entry = self._classify(element)
+            if entry:
+                self._table(entry[0])[entry[1]] = element
+                self._keys[_id_value(element.Id)] = entry
+        self.loaded = True
+        self.load_note = "built in one pass ({} elements, {:.0f} ms)".format(count, (time.time() - t0) * 1000)
+
+    def by_mark(self):
+        """Columns indexed by Mark (kept current like the other tables)."""
+        return self.columns
+
+    def refresh(self):
+        """Bring the tables up to date. Returns the number of elements re-read."""
+        if not self.loaded:
+            self.load()
+            return len(self._keys)
+
+        dirty, self._dirty = self._dirty, {}
+        for id_value, element_id in dirty.items():
+            self._drop(id_value)
+            element = self.doc.GetElement(element_id)
+            if element is None:
+                continue
+            entry = self._classify(element)
+            if entry:
+                self._add(entry[0], entry[1], element)
+        return len(dirty)
+
+    def on_changed(self, args):
+        """Record DocumentChanged ids; the elements are re-read lazily in refresh()."""
+        if not self.loaded:
+            return
+        tracked = _tracked_filter()
+        exported = self.export_changes
+        for element_id in args.GetAddedElementIds(tracked):
+            self._dirty[_id_value(element_id)] = element_id
+            if exported is not None:
+                exported[_id_value(element_id)] = element_id
+        for element_id in args.GetModifiedElementIds(tracked):
+            self._dirty[_id_value(element_id)] = element_id
+            if exported is not None:
+                exported[_id_value(element_id)] = element_id
+        for element_id in args.GetDeletedElementIds():
+            id_value = _id_value(element_id)
+            self._dirty.pop(id_value, None)
+            self._drop(id_value)
+            if exported is not None:
+                exported[id_value] = None
+
+def _tracked_filter():
+    """Elements the cache cares about: levels, grids and anything in the column category."""
+    return DB.LogicalOrFilter(
+        DB.LogicalOrFilter(DB.ElementClassFilter(DB.Level), DB.ElementClassFilter(DB.Grid)),
+        DB.ElementCategoryFilter(DB.BuiltInCategory.OST_StructuralColumns),
+    )
+
+def _doc_key(doc):
+    return doc.PathName or doc.Title
+
+def _registry():
+    """Session-wide {doc key: ElementCache}, stored on the AppDomain."""
+    from System import AppDomain
+    registry = AppDomain.CurrentDomain.GetData(CACHE_KEY)
+    if registry is None:
+        registry = {}
+        AppDomain.CurrentDomain.SetData(CACHE_KEY, registry)
+    return registry
+
+def _on_document_changed(sender, args):
+    try:
+        cache = _registry().get(_doc_key(args.GetDocument()))
+        if cache is not None:
+            cache.on_changed(args)
+    except Exception:
+        # Never let a cache problem surface inside someone else's transaction
+        pass
+
+def _on_document_closing(sender, args):
+    try:
+        _registry().pop(_doc_key(args.Document), None)
+    except Exception:
+        pass
+
+def get_cache(doc):
+    """The session cache for doc, created (and event handlers hooked up) on first use."""
+    registry = _registry()
+    key = _doc_key(doc)
+    cache = registry.get(key)
+    if cache is None or not cache.doc.IsValidObject:
+        if "__events__" not in registry:
+            doc.Application.DocumentChanged += _on_document_changed
+            doc.Application.DocumentClosing += _on_document_closing
+            registry["__events__"] = True
+        cache = ElementCache(doc)
+        registry[key] = cache
+    return cache
+
+# ----------------- manifest -----------------
+def build_manifest(doc):
+    """
+    Snapshot of what the pipeline needs to validate rows without Revit:
+    level names and elevations, grid names and endpoints (XY, feet) and the
+    available (family, type) pairs. "hash" covers everything but the metadata.
+    """
+    cache = get_cache(doc)
+    cache.refresh()
+
+    levels = sorted(
+        [{"name": name, "elevation": round(l.Elevation, 6)} for name, l in cache.levels.items()],
+        key=lambda lvl: (lvl["elevation"], lvl["name"]))
+
+    grids = []
+    for name in sorted(cache.grids.keys()):
+        curve = cache.grids[name].Curve
+        if curve is None:
+            continue
+        p0 = curve.GetEndPoint(0)
+        p1 = curve.GetEndPoint(1)
+        grids.append({"name": name,
+                      "start": [round(p0.X, 6), round(p0.Y, 6)],
+                      "end": [round(p1.X, 6), round(p1.Y, 6)]})
+
+    # Names as spelled in Revit: the pipeline writes them into the table
+    types = sorted([list(names) for names in (_symbol_name(s) for s in cache.types.values()) if names])
+
+    body = {"levels": levels, "grids": grids, "types": types}
+    digest = hashlib.sha1(json.dumps(body, sort_keys=True).encode("utf-8")).hexdigest()
+
+    manifest = {"hash": digest, "document": doc.Title, "generated": time.strftime("%Y-%m-%d %H:%M:%S")}
+    manifest.update(body)
+    return manifest
+
+def export_manifest(doc, path):
+    """
+    Write the model manifest to path (skipped when the model is unchanged).
+
+    Returns:
+        The manifest hash
+    """
+    manifest = build_manifest(doc)
+    previous = None
+    if os.path.isfile(path):
+        try:
+            with open(path, "r") as f:
+                previous = json.load(f).get("hash")
+        except Exception:
+            previous = None
+
+    if previous != manifest["hash"]:
+        with open(path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    get_cache(doc).manifest_hash = manifest["hash"]
+    return manifest["hash"]
+
+# ----------------- sync -----------------
+def read_csv_rows(csv_path):
+    """Read the columns CSV into a list of row dicts"""
+    with open(csv_path, "r") as f:
+        return list(csv.DictReader(f))
+
+def _parse_element_id(value):
+    """Integer ElementId from a CSV cell ("123", "123.0"), or None"""
+    try:
+        return int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+
+def _resolve_column(doc, r, cid, cache, stats):
+    """
+    Find the existing column for a row. The stored ElementId (or UniqueId)
+    is tried first and verified with a Mark check; the Mark table is only
+    used when the ids are missing or stale.
+
+    A column without a Mark (exported by export_columns.py, which makes up
+    its column_id) is taken by its id and gets the column_id as its Mark,
+    so it is updated instead of duplicated.
+    """
+    eid = _parse_element_id(r.get("element_id"))
+    uid = (r.get("unique_id") or "").strip()
+    if eid is None and not uid:
+        return cache.by_mark().get(cid)
+
+    inst = doc.GetElement(DB.ElementId(eid)) if eid is not None else None
+    if inst is None and uid:
+        inst = doc.GetElement(uid)
+
+    if inst is not None and isinstance(inst, DB.FamilyInstance) and _is_column_category(inst):
+        mark = _mark_of(inst)
+        if mark is None:
+            p_mark = inst.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
+            if p_mark and not p_mark.IsReadOnly:
+                p_mark.Set(cid)
+                mark = cid
+        if mark == cid:
+            stats["id_hits"] += 1
+            return inst
+
+    stats["id_stale"] += 1
+    return cache.by_mark().get(cid)
+
+def open_csv_for_write(csv_path):
+    """Open a CSV for csv.writer on both IronPython 2 and CPython 3"""
+    # Binary mode on IronPython 2 so the csv module doesn't double the line endings
+    if sys.version_info[0] < 3:
+        return open(csv_path, "wb")
+    return open(csv_path, "w", newline="")
+
+def write_back_ids(csv_path, ids, id_field="column_id"):
+    """
+    Record each element's ElementId and UniqueId in the CSV.
+
+    Args:
+        csv_path: Table CSV to update (columns.csv, beams.csv, ...)
+        ids: {id: (element_id, unique_id)}
+        id_field: Id column of the table
+
+    Returns:
+        Number of rows whose ids changed
+    """
+    if not ids:
+        return 0
 
-    # Read CSV
     with open(csv_path, "r") as f:
-        rows = list(csv.DictReader(f))
+        reader = csv.DictReader(f)
+        fields = list(reader.fieldnames or [])
+        rows = list(reader)
+
+    changed = 0
+    new_fields = [name for name in ID_FIELDS if name not in fields]
+    for r in rows:
+        entry = ids.get((r.get(id_field) or "").strip())
+        if entry and (r.get("element_id"), r.get("unique_id")) != entry:
+            r["element_id"], r["unique_id"] = entry
+            changed += 1
+
+    if changed or new_fields:
+        with open_csv_for_write(csv_path) as f:
+            writer = csv.DictWriter(f, fieldnames=fields + new_fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    return changed
+
+def restore_rows(csv_path, backup_path, row_ids, id_field="column_id"):
+    """
+    Put back rows of a table from its backup, e.g. rows a committed sync skipped.
+
+    Args:
+        csv_path: Table CSV to update (columns.csv, beams.csv, ...)
+        backup_path: Copy of the table taken before the pipeline changed it
+        row_ids: Ids of the rows to restore; rows not in the backup are removed
+        id_field: Id column of the table
+
+    Returns:
+        Number of rows restored or removed
+    """
+    row_ids = set(row_ids)
+    if not row_ids:
+        return 0
+
+    backup = {}
+    for r in read_csv_rows(backup_path):
+        backup.setdefault((r.get(id_field) or "").strip(), r)
+
+    with open(csv_path, "r") as f:
+        reader = csv.DictReader(f)
+        fields = list(reader.fieldnames or [])
+        rows = list(reader)
+
+    kept = []
+    restored = 0
+    for r in rows:
+        rid = (r.get(id_field) or "").strip()
+        if rid not in row_ids:
+            kept.append(r)
+            continue
+        restored += 1
+        if rid in backup:
+            r.update(backup[rid])
+            kept.append(r)
+
+    if restored:
+        with open_csv_for_write(csv_path) as f:
+            writer = csv.DictWriter(f, fieldnames=fields, restval="", extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(kept)
+    return restored
+
+def _skip(stats, reason, detail=""):
+    stats["skipped"] += 1
+    stats["skip_reasons"][reason] = stats["skip_reasons"].get(reason, 0) + 1
+    if detail:
+        stats["errors"].append("{}: {}".format(reason, detail))
+
+def _row_point(r):
+    """Placement point precomputed by the pipeline (place_x / place_y), or None"""
+    try:
+        return DB.XYZ(float(r["place_x"]), float(r["place_y"]), 0)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def _sync_row(doc, r, idx, cache, stats, use_points=False):
+    """Create or update the column for one row. Returns its column_id, or None if skipped."""
+    levels = cache.levels
+    grids = cache.grids
+    type_cache = cache.types
+
+    cid = (r.get("column_id") or "").strip()
+    if not cid:
+        _skip(stats, "missing column_id", "row {}".format(idx + 2))
+        return None
+
+    # Get CSV values
+    base_name = (r.get("base_level") or "").strip()
+    top_name = (r.get("top_level") or "").strip()
+    gA_name = (r.get("alpha_grid") or "").strip()
+    gN_name = str(r.get("numeric_grid") or "").strip()
+    fam_name = (r.get("column_type") or "").strip()
+    type_name = (r.get("size") or "").strip()
+
+    # Validate levels
+    base_level = levels.get(base_name)
+    top_level = levels.get(top_name)
+    if not base_level or not top_level:
+        _skip(stats, "level not found", "{}".format(cid))
+        return cid
+
+    # Validate grids
+    gA = grids.get(gA_name)
+    gN = grids.get(gN_name)
+    if not gA or not gN:
+        _skip(stats, "grid not found", "{}".format(cid))
+        return cid
+
+    # Get intersection point (precomputed by the pipeline if the manifest is current)
+    pt = _row_point(r) if use_points else None
+    if pt is None:
+        pt = grid_intersection_point(gA, gN)
+    if not pt:
+        _skip(stats, "grid intersection failed", "{}".format(cid))
+        return cid
+
+    # Find family symbol
+    sym = find_symbol_strict(fam_name, type_name, type_cache)
+    if not sym:
+        _skip(stats, "family/type not found", "{} - {}".format(fam_name, type_name))
+        return cid
+
+    # Activate symbol if needed
+    if not sym.IsActive:
+        sym.Activate()
+        doc.Regenerate()
+
+    # Check if column exists (stored id first, Mark as fallback)
+    inst = _resolve_column(doc, r, cid, cache, stats)
+
+    if inst is None:
+        # CREATE NEW COLUMN
+        try:
+            inst = doc.Create.NewFamilyInstance(
+                pt, sym, base_level, DB.Structure.StructuralType.Column
+            )
+
+            if inst:
+                # Set Mark parameter to column_id
+                p_mark = inst.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
+                if p_mark and not p_mark.IsReadOnly:
+                    p_mark.Set(cid)
+
+                # Set levels
+                set_base_top_levels(inst, base_level, top_level)
+
+                stats["ids"][cid] = (str(_id_value(inst.Id)), inst.UniqueId)
+                stats["created"] += 1
+            else:
+                _skip(stats, "failed to create", "{}".format(cid))
+
+        except Exception as e:
+            _skip(stats, "creation error", "{}: {}".format(cid, str(e)))
+
+    else:
+        # UPDATE EXISTING COLUMN
+        try:
+            # Update location
+            loc = inst.Location
+            if isinstance(loc, DB.LocationPoint):
+                loc.Point = pt
+
+            # Update type if different
+            if inst.Symbol.Id != sym.Id:
+                inst.Symbol = sym
+
+            # Update levels
+            set_base_top_levels(inst, base_level, top_level)
+
+            stats["ids"][cid] = (str(_id_value(inst.Id)), inst.UniqueId)
+            stats["updated"] += 1
+
+        except Exception as e:
+            _skip(stats, "update error", "{}: {}".format(cid, str(e)))
+
+    return cid
+
+def new_stats(rows, partial, cache_note, type_cache, points, category="columns", id_field="column_id"):
+    """Empty statistics dict for one category's sync (see format_report)"""
+    return {
+        "category": category,
+        "id_field": id_field,
+        "rows": len(rows),
+        "partial": partial,
+        "cache": cache_note,
+        "created": 0,
+        "updated": 0,
+        "skipped": 0,
+        "deleted": 0,
+        "skip_reasons": {},
+        "errors": [],
+        "type_cache": type_cache,
+        "chunks": [],
+        "outcome": "committed",
+        "interrupted": None,
+        "ids": {},
+        "points": points,
+        "id_hits": 0,
+        "id_stale": 0,
+    }
+
+def run_chunks(doc, rows, sync_one, stats, label="columns", chunk_size=CHUNK_SIZE):
+    """
+    Call sync_one(row, index) for every row, committed in sub-transactions of
+    chunk_size rows, with a cancellable progress bar. Run it inside a started
+    TransactionGroup; a failing chunk is rolled back on its own.
+
+    Returns:
+        None if every chunk was committed, else what interrupted the sync
+    """
+    total = len(rows)
+    with forms.ProgressBar(title="Syncing {} ({{value}} of {{max_value}})".format(label),
+                           cancellable=True) as pb:
+        for start in range(0, total, chunk_size):
+            if pb.cancelled:
+                return "cancelled at {} row {} of {}".format(label, start, total)
+
+            chunk = rows[start:start + chunk_size]
+            t0 = time.time()
+            try:
+                with revit.Transaction("Sync {} {}-{}".format(label.capitalize(), start + 1, start + len(chunk)), doc=doc):
+                    for offset, r in enumerate(chunk):
+                        try:
+                            sync_one(r, start + offset)
+                        except Exception as e:
+                            _skip(stats, "row processing error", "row {}: {}".format(start + offset + 2, str(e)))
+            except Exception as e:
+                interrupted = "{} rows {}-{} failed: {}".format(label, start + 1, start + len(chunk), str(e))
+                stats["errors"].append(interrupted)
+                return interrupted
+
+            elapsed = time.time() - t0
+            rate = len(chunk) / elapsed if elapsed > 0 else float(len(chunk))
+            stats["chunks"].append({"rows": len(chunk), "seconds": elapsed, "rows_per_sec": rate})
+            print("Chunk {} rows {}-{}: {:.2f}s ({:.0f} rows/s)".format(
+                label, start + 1, start + len(chunk), elapsed, rate))
+            pb.update_progress(start + len(chunk), total)
+    return None
 
+def finish_group(group, stats_list):
+    """
+    Close a sync TransactionGroup. If any sync was interrupted the user
+    chooses whether to keep (assimilate) or roll back everything synced so far.
+    """
+    interrupted = [s["interrupted"] for s in stats_list if s["interrupted"]]
+    keep = True
+    if interrupted:
+        choice = forms.alert(
+            "Sync {}.\n\n{} created, {} updated so far.".format(
+                "; ".join(interrupted),
+                sum(s["created"] for s in stats_list), sum(s["updated"] for s in stats_list)),
+            title="Sync Interrupted",
+            options=["Keep synced rows", "Roll back everything"]
+        )
+        keep = choice == "Keep synced rows"
+
+    if keep:
+        group.Assimilate()
+        outcome = "partially committed ({})".format("; ".join(interrupted)) if interrupted else "committed"
+    else:
+        group.RollBack()
+        outcome = "rolled back ({})".format("; ".join(interrupted))
+    for s in stats_list:
+        s["outcome"] = outcome
+        if not keep:
+            s["ids"] = {}
+
+def sync_rows(doc, rows, partial=False, delete_missing=DELETE_MISSING, chunk_size=CHUNK_SIZE,
+              manifest_hash=None, group=None):
+    """
+    Create or update one structural column per row.
+
+    Rows are committed in sub-transactions of chunk_size rows inside one
+    TransactionGroup, with a cancellable progress bar. If the user cancels or
+    a chunk fails, they choose whether to keep (assimilate) or roll back
+    everything synced so far.
+
+    Args:
+        doc: Revit document
+        rows: Row dicts with the columns.csv fields
+        partial: rows is only a subset of the table (never delete missing columns)
+        delete_missing: delete columns whose Mark is not in rows
+        chunk_size: rows per sub-transaction
+        manifest_hash: manifest the rows' place_x / place_y were computed from;
+                       the points are only used if it is still current
+        group: Started TransactionGroup of a multi-category sync; the caller
+               closes it (see category_sync.sync_payloads)
+
+    Returns:
+        Statistics dict for format_report()
+    """
     if not rows:
-        forms.alert("CSV file is empty!", exitscript=True)
+        raise ValueError("No rows to sync!")
 
     # Collect project data
-    levels = collect_levels()
-    grids = collect_grids()
-    existing = existing_columns_by_mark()
-    type_cache = get_all_column_types()
+    cache = get_cache(doc)
+    was_loaded = cache.loaded
+    reread = cache.refresh()
+    use_points = manifest_hash is not None and manifest_hash == cache.manifest_hash
     csv_ids = set()
 
     # Check if we have necessary data
-    if not levels:
-        forms.alert("No levels found in project!", exitscript=True)
-    if not grids:
-        forms.alert("No grids found in project!", exitscript=True)
-    if not type_cache:
-        forms.alert("No structural column types found in project!\n\nAvailable types: {}".format(len(type_cache)), exitscript=True)
+    if not cache.levels:
+        raise RuntimeError("No levels found in project!")
+    if not cache.grids:
+        raise RuntimeError("No grids found in project!")
+    if not cache.types:
+        raise RuntimeError("No structural column types found in project!")
 
     # Statistics
-    created = updated = skipped = deleted = 0
-    skip_reasons = {}
-    errors = []
-
-    def skip(reason, detail=""):
-        global skipped
-        skipped += 1
-        skip_reasons[reason] = skip_reasons.get(reason, 0) + 1
-        if detail:
-            errors.append("{}: {}".format(reason, detail))
-
-    # Start transaction
-    with revit.Transaction("Sync Columns From CSV"):
-        for idx, r in enumerate(rows):
-            try:
-                cid = (r.get("column_id") or "").strip()
-                if not cid:
-                    skip("missing column_id", "row {}".format(idx + 2))
-                    continue
-
-                csv_ids.add(cid)
-
-                # Get CSV values
-                base_name = (r.get("base_level") or "").strip()
-                top_name = (r.get("top_level") or "").strip()
-                gA_name = (r.get("alpha_grid") or "").strip()
-                gN_name = str(r.get("numeric_grid") or "").strip()
-                fam_name = (r.get("column_type") or "").strip()
-                type_name = (r.get("size") or "").strip()
-
-                # Validate levels
-                base_level = levels.get(base_name)
-                top_level = levels.get(top_name)
-                if not base_level or not top_level:
-                    skip("level not found", "{}".format(cid))
-                    continue
-
-                # Validate grids
-                gA = grids.get(gA_name)
-                gN = grids.get(gN_name)
-                if not gA or not gN:
-                    skip("grid not found", "{}".format(cid))
-                    continue
-
-                # Get intersection point
-                pt = grid_intersection_point(gA, gN)
-                if not pt:
-                    skip("grid intersection failed", "{}".format(cid))
-                    continue
-
-                # Find family symbol
-                sym = find_symbol_strict(fam_name, type_name, type_cache)
-                if not sym:
-                    skip("family/type not found", "{} - {}".format(fam_name, type_name))
-                    continue
-
-                # Activate symbol if needed
-                if not sym.IsActive:
-                    sym.Activate()
-                    doc.Regenerate()
-
-                # Check if column exists by Mark
-                inst = existing.get(cid)
-
-                if inst is None:
-                    # CREATE NEW COLUMN
-                    try:
-                        inst = doc.Create.NewFamilyInstance(
-                            pt, sym, base_level, DB.Structure.StructuralType.Column
-                        )
-
-                        if inst:
-                            # Set Mark parameter to column_id
-                            p_mark = inst.get_Parameter(DB.BuiltInParameter.ALL_MODEL_MARK)
-                            if p_mark and not p_mark.IsReadOnly:
-                                p_mark.Set(cid)
-
-                            # Set levels
-                            set_base_top_levels(inst, base_level, top_level)
-
-                            created += 1
-                        else:
-                            skip("failed to create", "{}".format(cid))
-
-                    except Exception as e:
-                        skip("creation error", "{}: {}".format(cid, str(e)))
-
-                else:
-                    # UPDATE EXISTING COLUMN
-                    try:
-                        # Update location
-                        loc = inst.Location
-                        if isinstance(loc, DB.LocationPoint):
-                            loc.Point = pt
-
-                        # Update type if different
-                        if inst.Symbol.Id != sym.Id:
-                            inst.Symbol = sym
-
-                        # Update levels
-                        set_base_top_levels(inst, base_level, top_level)
-
-                        updated += 1
-
-                    except Exception as e:
-                        skip("update error", "{}: {}".format(cid, str(e)))
-
-            except Exception as e:
-                skip("row processing error", "row {}: {}".format(idx + 2, str(e)))
+    stats = new_stats(
+        rows, partial,
+        "reused ({} elements re-read)".format(reread) if was_loaded else cache.load_note,
+        cache.types,
+        "precomputed" if use_points else "from grids")
+
+    def sync_one(r, idx):
+        cid = _sync_row(doc, r, idx, cache, stats, use_points)
+        if cid:
+            csv_ids.add(cid)
+
+    own_group = group is None
+    if own_group:
+        group = DB.TransactionGroup(doc, "Sync Columns From CSV")
+        group.Start()
+    try:
+        stats["interrupted"] = run_chunks(doc, rows, sync_one, stats, "columns", chunk_size)
 
-        # Delete columns not in CSV (only if enabled)
-        if DELETE_MISSING:
+        # Delete columns not in CSV (only if enabled, never for a partial row set)
+        if delete_missing and not partial and not stats["interrupted"]:
             try:
-                for cid, inst in existing.items():
-                    if cid not in csv_ids:
-                        try:
-                            doc.Delete(inst.Id)
-                            deleted += 1
-                        except:
-                            pass
+                with revit.Transaction("Delete Columns Missing From CSV", doc=doc):
+                    for cid, inst in list(cache.by_mark().items()):
+                        if cid not in csv_ids:
+                            try:
+                                doc.Delete(inst.Id)
+                                stats["deleted"] += 1
+                            except:
+                                pass
             except Exception as e:
-                errors.append("Delete error: {}".format(str(e)))
+                stats["errors"].append("Delete error: {}".format(str(e)))
+
+        if own_group:
+            finish_group(group, [stats])
+
+    except Exception:
+        if own_group and group.HasStarted():
+            group.RollBack()
+        raise
+
+    return stats
 
-    # ----------------- report -----------------
+# ----------------- report -----------------
+def format_report(stats):
+    """Build the sync summary shown to the user"""
+    skip_reasons = stats["skip_reasons"]
+    errors = stats["errors"]
+    type_cache = stats["type_cache"]
+
+    category = stats.get("category", "columns")
+    title = "CSV Sync Complete" if stats["outcome"] == "committed" else "CSV Sync Finished"
     msg_lines = [
-        "CSV Sync Complete",
+        title if category == "columns" else "{} - {}".format(title, category),
         "=" * 50,
         "",
-        "Rows read  : {}".format(len(rows)),
-        "Created    : {}".format(created),
-        "Updated    : {}".format(updated),
-        "Deleted    : {}".format(deleted),
-        "Skipped    : {}".format(skipped),
+        "Rows read  : {}{}".format(stats["rows"], " (changed rows only)" if stats["partial"] else ""),
+        "Created    : {}".format(stats["created"]),
+        "Updated    : {}".format(stats["updated"]),
+        "Deleted    : {}".format(stats["deleted"]),
+        "Skipped    : {}".format(stats["skipped"]),
+        "Lookups    : {}".format(stats["cache"]),
+        "Id lookups : {} by ElementId, {} fell back to Mark".format(stats["id_hits"], stats["id_stale"]),
+        "Placement  : {}".format(stats["points"]),
+        "Outcome    : {}".format(stats["outcome"]),
     ]
 
-    if skipped and skip_reasons:
+    chunks = stats["chunks"]
+    if chunks:
+        seconds = sum(c["seconds"] for c in chunks)
+        rows_done = sum(c["rows"] for c in chunks)
+        msg_lines.append("Throughput : {} chunks, {:.1f}s, {:.0f} rows/s".format(
+            len(chunks), seconds, rows_done / seconds if seconds > 0 else float(rows_done)))
+
+    if stats["skipped"] and skip_reasons:
         msg_lines.append("")
         msg_lines.append("Skip reasons:")
         for k in sorted(skip_reasons.keys()):
@@ -351,19 +852,38 @@ try:
     # Show available types if family/type not found was an issue
     if "family/type not found" in skip_reasons:
         msg_lines.append("")
-        msg_lines.append("Available column types ({} found):".format(len(type_cache)))
+        msg_lines.append("Available {} types ({} found):".format(category.rstrip("s"), len(type_cache)))
         for (fam, typ) in sorted(list(type_cache.keys())[:10]):
             msg_lines.append("  - '{}' : '{}'".format(fam, typ))
         if len(type_cache) > 10:
             msg_lines.append("  ... and {} more".format(len(type_cache) - 10))
 
     msg_lines.append("")
-    msg_lines.append("Columns use 'Mark' parameter for tracking (column_id)")
+    msg_lines.append("{} use 'Mark' parameter for tracking ({})".format(
+        category.capitalize(), stats.get("id_field", "column_id")))
+
+    return "\n".join(msg_lines)
+
+# ----------------- main -----------------
+def main():
+    csv_path = forms.pick_file(file_ext="csv", title="Select columns CSV")
+    if not csv_path:
+        forms.alert("No CSV selected.", exitscript=True)
+
+    rows = read_csv_rows(csv_path)
+    if not rows:
+        forms.alert("CSV file is empty!", exitscript=True)
 
-    forms.alert("\n".join(msg_lines), title="Sync Complete")
+    stats = sync_rows(revit.doc, rows)
+    write_back_ids(csv_path, stats["ids"])
+    forms.alert(format_report(stats), title="Sync Complete")
 
-except Exception as e:
-    forms.alert("CRITICAL ERROR: {}\n\nType: {}".format(str(e), type(e).__name__),
-                title="Script Failed")
-    import traceback
-    print(traceback.format_exc())
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        forms.alert("CRITICAL ERROR: {}\n\nType: {}".format(str(e), type(e).__name__),
+                    title="Script Failed")
+        import traceback
+        print(traceback.format_exc())
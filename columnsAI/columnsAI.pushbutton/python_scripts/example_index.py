@@ -0,0 +1,86 @@
+"""
+Retrieval of few-shot examples for the parser prompt.
+
+Past runs that completed successfully are (prompt, operations) pairs in our
+office's own phrasing. ExampleIndex builds a TF-IDF index over them (plus
+the built-in examples) so the parser prompt only carries the k examples
+most similar to the request at hand instead of a fixed list.
+"""
+import glob
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+
+TOKEN = re.compile(r"[a-z]+|\d+")
+MAX_HISTORY = 500   # most recent run logs considered
+
+
+def tokens(text):
+    """Lowercase word and number tokens plus word bigrams ("level 5" -> level, 5, level_5)."""
+    words = TOKEN.findall(str(text or "").lower())
+    return words + ["{}_{}".format(a, b) for a, b in zip(words, words[1:])]
+
+
+def load_past_examples(log_dir, limit=MAX_HISTORY):
+    """
+    (prompt, operations) pairs of completed runs from the JSON run logs,
+    newest first, one per distinct prompt.
+    """
+    examples = []
+    seen = set()
+    for path in sorted(glob.glob(os.path.join(log_dir, "*.json")), reverse=True)[:limit]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            continue
+        text = str(entry.get("input") or "").strip()
+        ops = (entry.get("ai_response") or {}).get("operations")
+        if entry.get("status") != "completed" or entry.get("dry_run") or not text or not ops:
+            continue
+        key = " ".join(text.lower().split())
+        if key in seen:
+            continue
+        seen.add(key)
+        examples.append((text, ops))
+    return examples
+
+
+class ExampleIndex(object):
+    """
+    TF-IDF index over example prompts. Each prompt is a sparse unit vector
+    (sublinear tf times smoothed idf); an inverted index from token to
+    (example, weight) scores a query against only the examples sharing a
+    token with it.
+    """
+
+    def __init__(self, examples):
+        self.examples = list(examples)
+        counts = [Counter(tokens(text)) for text, _ in self.examples]
+        df = Counter(token for c in counts for token in c)
+        n = len(self.examples)
+        self.idf = {token: math.log((1.0 + n) / (1.0 + d)) + 1.0 for token, d in df.items()}
+        self.postings = defaultdict(list)
+        for i, c in enumerate(counts):
+            for token, weight in self._vector(c).items():
+                self.postings[token].append((i, weight))
+
+    def _vector(self, counts):
+        weights = {token: (1.0 + math.log(tf)) * self.idf[token]
+                   for token, tf in counts.items() if token in self.idf}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+        return {token: w / norm for token, w in weights.items()}
+
+    def __len__(self):
+        return len(self.examples)
+
+    def top(self, text, k):
+        """The k examples most similar to text: [(prompt, operations, score), ...], best first."""
+        scores = defaultdict(float)
+        for token, weight in self._vector(Counter(tokens(text))).items():
+            for i, doc_weight in self.postings[token]:
+                scores[i] += weight * doc_weight
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.examples[i][0], self.examples[i][1], round(score, 3)) for i, score in best]
@@ -0,0 +1,226 @@
+# pyRevit export_columns.py - Export Structural Columns from Revit to CSV
+# Reverse of columns.py: writes the columns.csv schema from the model, to
+# bootstrap the table for an existing model or reconcile it after manual edits.
+# - column_id   = Mark (or {alpha}{numeric}-{base}{top} if the column has none)
+# - column_type = Family name, size = Type name
+# - alpha_grid / numeric_grid = nearest grids to the column location
+#
+# Importable module (export_columns(doc, csv_path, incremental)); running this
+# file directly as a pyRevit script asks for the target CSV.
+
+from pyrevit import revit, DB, forms
+import bisect
+import csv
+import math
+import os
+import time
+
+from columns import (get_cache, open_csv_for_write, _id_value, _is_column_category,
+                     _mark_of, ID_FIELDS)
+
+FIELDS = ["column_id", "base_level", "top_level", "alpha_grid",
+          "numeric_grid", "column_type", "size"] + ID_FIELDS
+
+GRID_TOLERANCE = 1.0     # feet; columns further than this from a grid line are reported
+
+# ----------------- grid lookup -----------------
+class GridLocator(object):
+    """
+    Nearest-grid lookup. Grids are grouped by direction; within a group each
+    grid is reduced to its offset along the group normal and kept sorted, so
+    a query is one dot product and a bisection per direction.
+    """
+
+    def __init__(self, grids):
+        groups = {}
+        for name, g in grids.items():
+            curve = g.Curve
+            if curve is None:
+                continue
+            p0 = curve.GetEndPoint(0)
+            p1 = curve.GetEndPoint(1)
+            dx, dy = p1.X - p0.X, p1.Y - p0.Y
+            length = math.hypot(dx, dy)
+            if length < 1e-9:
+                continue
+            dx, dy = dx / length, dy / length
+            # Same direction either way round
+            if dx < -1e-9 or (abs(dx) <= 1e-9 and dy < 0):
+                dx, dy = -dx, -dy
+            key = round(math.degrees(math.atan2(dy, dx)), 1)
+            nx, ny = -dy, dx
+            group = groups.setdefault(key, {"normal": (nx, ny), "items": []})
+            group["items"].append((nx * p0.X + ny * p0.Y, name))
+
+        self.groups = []
+        for group in groups.values():
+            items = sorted(group["items"])
+            self.groups.append((group["normal"], [o for o, _ in items], [n for _, n in items]))
+
+    def nearest(self, x, y):
+        """(grid name, distance) of the closest grid line to (x, y), or (None, None)"""
+        best_name, best_dist = None, None
+        for (nx, ny), offsets, names in self.groups:
+            d = nx * x + ny * y
+            i = bisect.bisect_left(offsets, d)
+            for j in (i - 1, i):
+                if 0 <= j < len(offsets):
+                    dist = abs(offsets[j] - d)
+                    if best_dist is None or dist < best_dist:
+                        best_name, best_dist = names[j], dist
+        return best_name, best_dist
+
+def _is_numeric_grid(name):
+    return name[:1].isdigit()
+
+# ----------------- extraction -----------------
+def _level_name(inst, bip, level_names):
+    p = inst.get_Parameter(bip)
+    if p is None:
+        return ""
+    return level_names.get(_id_value(p.AsElementId()), "")
+
+def _extract(inst, level_names, alpha_locator, numeric_locator, stats):
+    """One CSV row for a column instance, or None if it has no point location"""
+    loc = inst.Location
+    if not isinstance(loc, DB.LocationPoint):
+        stats["skipped"] += 1
+        return None
+    pt = loc.Point
+
+    alpha, d_alpha = alpha_locator.nearest(pt.X, pt.Y)
+    numeric, d_numeric = numeric_locator.nearest(pt.X, pt.Y)
+    if d_alpha is None or d_numeric is None or max(d_alpha, d_numeric) > GRID_TOLERANCE:
+        stats["off_grid"] += 1
+
+    base = _level_name(inst, DB.BuiltInParameter.FAMILY_BASE_LEVEL_PARAM, level_names)
+    top = _level_name(inst, DB.BuiltInParameter.FAMILY_TOP_LEVEL_PARAM, level_names)
+    symbol = inst.Symbol
+
+    return {
+        "column_id": _mark_of(inst) or "{}{}-{}{}".format(alpha or "", numeric or "", base, top),
+        "base_level": base,
+        "top_level": top,
+        "alpha_grid": alpha or "",
+        "numeric_grid": numeric or "",
+        "column_type": symbol.FamilyName,
+        "size": DB.Element.Name.GetValue(symbol),
+        "element_id": str(_id_value(inst.Id)),
+        "unique_id": inst.UniqueId,
+    }
+
+def _sort_key(row, elevations):
+    numeric = row["numeric_grid"]
+    return (elevations.get(row["base_level"], 0.0), row["alpha_grid"],
+            int(numeric) if numeric.isdigit() else numeric)
+
+def export_columns(doc, csv_path, incremental=False):
+    """
+    Write all structural columns of doc to csv_path in the columns.csv schema.
+
+    With incremental=True, only columns added, modified or deleted since the
+    last export in this Revit session are re-extracted and merged into the
+    existing file. A full export runs instead if there is no such baseline,
+    the baseline was exported to another file, or a level, grid or column
+    type changed (those affect many rows at once).
+
+    Returns:
+        Statistics dict (rows, extracted, skipped, off_grid, mode, seconds)
+    """
+    t0 = time.time()
+    cache = get_cache(doc)
+    cache.refresh()
+
+    level_names = dict((_id_value(l.Id), name) for name, l in cache.levels.items())
+    elevations = dict((name, l.Elevation) for name, l in cache.levels.items())
+    alpha_locator = GridLocator(dict((n, g) for n, g in cache.grids.items() if not _is_numeric_grid(n)))
+    numeric_locator = GridLocator(dict((n, g) for n, g in cache.grids.items() if _is_numeric_grid(n)))
+
+    stats = {"extracted": 0, "skipped": 0, "off_grid": 0, "mode": "full"}
+
+    changes = cache.export_changes
+    rows_by_id = None
+    same_file = (cache.export_path is not None and
+                 os.path.normcase(os.path.abspath(csv_path)) == cache.export_path)
+    if incremental and changes is not None and same_file and os.path.isfile(csv_path):
+        rows_by_id = {}
+        with open(csv_path, "r") as f:
+            for r in csv.DictReader(f):
+                rows_by_id[r.get("element_id") or r.get("column_id")] = r
+        to_extract = []
+        for id_value, element_id in changes.items():
+            rows_by_id.pop(str(id_value), None)
+            element = doc.GetElement(element_id) if element_id is not None else None
+            if element is None:
+                continue
+            if isinstance(element, DB.FamilyInstance) and _is_column_category(element):
+                to_extract.append(element)
+            else:
+                # Level, grid or type changed: rows can't be patched one by one
+                rows_by_id = None
+                break
+        if rows_by_id is not None:
+            stats["mode"] = "incremental ({} changed)".format(len(changes))
+            instances = to_extract
+
+    if rows_by_id is None:
+        rows_by_id = {}
+        # One collector pass over the column instances
+        instances = (DB.FilteredElementCollector(doc)
+                     .OfCategory(DB.BuiltInCategory.OST_StructuralColumns)
+                     .WhereElementIsNotElementType())
+
+    for inst in instances:
+        if not isinstance(inst, DB.FamilyInstance):
+            continue
+        row = _extract(inst, level_names, alpha_locator, numeric_locator, stats)
+        if row:
+            rows_by_id[row["element_id"]] = row
+            stats["extracted"] += 1
+
+    rows = sorted(rows_by_id.values(), key=lambda r: _sort_key(r, elevations))
+    with open_csv_for_write(csv_path) as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+    # Baseline for the next incremental export (to this file only)
+    cache.export_changes = {}
+    cache.export_path = os.path.normcase(os.path.abspath(csv_path))
+
+    stats["rows"] = len(rows)
+    stats["seconds"] = time.time() - t0
+    return stats
+
+# ----------------- main -----------------
+def main():
+    csv_path = forms.save_file(file_ext="csv", title="Export columns to CSV")
+    if not csv_path:
+        forms.alert("No CSV selected.", exitscript=True)
+
+    mode = forms.CommandSwitchWindow.show(["Full export", "Incremental export"],
+                                          message="Export mode")
+    if not mode:
+        forms.alert("Operation cancelled.", exitscript=True)
+
+    stats = export_columns(revit.doc, csv_path, incremental=(mode == "Incremental export"))
+    forms.alert(
+        "Column Export Complete\n{}\n\n"
+        "Mode       : {}\n"
+        "Rows       : {}\n"
+        "Extracted  : {} in {:.2f}s\n"
+        "Skipped    : {} (no point location)\n"
+        "Off grid   : {} (> {} ft from nearest grid)".format(
+            "=" * 50, stats["mode"], stats["rows"], stats["extracted"], stats["seconds"],
+            stats["skipped"], stats["off_grid"], GRID_TOLERANCE),
+        title="Export Complete")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        forms.alert("CRITICAL ERROR: {}\n\nType: {}".format(str(e), type(e).__name__),
+                    title="Script Failed")
+        import traceback
+        print(traceback.format_exc())
@@ -0,0 +1,125 @@
+"""
+Revit-free checks against the model manifest exported by columns.py.
+
+The manifest (model_manifest.json) lists the model's levels with elevations,
+grids with their endpoint coordinates and the available (family, type) pairs.
+With it the pipeline can reject rows that the sync would skip, and precompute
+placement points, without a round trip through Revit.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from categories import get_category
+
+
+def load_manifest(path):
+    """
+    Load a manifest file.
+
+    Args:
+        path: Path to model_manifest.json
+
+    Returns:
+        Manifest dict, or None if the file does not exist
+    """
+    if not os.path.isfile(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _names(series):
+    """Cell values as stripped strings, formatted as they read back from the CSV."""
+    def fmt(v):
+        if pd.isna(v):
+            return ""
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return str(v).strip()
+    # Categoricals map once per category; astype(object) gives plain strings back
+    return series.map(fmt).astype(object)
+
+
+def validate_changes(df, mask, manifest, category=None, check_types=True):
+    """
+    Check the rows selected by mask against the manifest, vectorized.
+
+    Levels and grids are checked for every category; (family, type) pairs
+    only where the manifest lists the category's types.
+
+    Args:
+        df: Element table
+        mask: Boolean Series of rows to check (usually the changed rows)
+        manifest: Manifest dict from load_manifest()
+        category: Category of the table (default: columns)
+        check_types: False if the type names were already resolved against
+                     the manifest (run_pipeline.resolve_type_names)
+
+    Returns:
+        List of problem strings, e.g. "family/type not found: UC - 356x406x634 (60 rows)"
+    """
+    sub = df.loc[mask]
+    if sub.empty:
+        return []
+
+    category = get_category(category)
+    level_names = {lvl["name"] for lvl in manifest.get("levels", [])}
+    grid_names = {g["name"] for g in manifest.get("grids", [])}
+
+    checks = []
+    for field in category.level_fields:
+        values = _names(sub[field])
+        checks.append(("level not found", values, ~values.isin(level_names)))
+    for field in category.grid_fields:
+        values = _names(sub[field])
+        checks.append(("grid not found", values, ~values.isin(grid_names)))
+
+    types = manifest.get(category.manifest_types) if category.manifest_types else None
+    if types is not None and check_types:
+        type_keys = {"{}|{}".format(fam.lower(), typ.lower()) for fam, typ in types}
+        family = _names(sub[category.family_field])
+        size = _names(sub[category.type_field])
+        pairs = family + " - " + size
+        keys = family.str.lower() + "|" + size.str.lower()
+        checks.append(("family/type not found", pairs, ~keys.isin(type_keys)))
+
+    problems = []
+    for reason, values, bad in checks:
+        if bad.any():
+            for value, count in values[bad].value_counts().items():
+                problems.append("{}: {} ({} rows)".format(reason, value, int(count)))
+    return problems
+
+
+def placement_points(df, mask, manifest, grid_fields=("alpha_grid", "numeric_grid")):
+    """
+    Intersect the two grid lines of the selected rows, vectorized.
+
+    Same 2D line-line math as grid_intersection_point in columns.py, in
+    Revit internal units (feet).
+
+    Returns:
+        DataFrame with place_x / place_y for the selected rows (NaN where a grid
+        is missing or the grids are parallel)
+    """
+    sub = df.loc[mask]
+    grids = manifest.get("grids", [])
+    names = pd.Index([g["name"] for g in grids])
+    coords = np.array([g["start"] + g["end"] for g in grids], dtype=float).reshape(-1, 4)
+    # Extra NaN row for grids that are not in the manifest (indexer -1)
+    coords = np.vstack([coords, np.full((1, 4), np.nan)])
+
+    a = coords[names.get_indexer(_names(sub[grid_fields[0]]))]
+    n = coords[names.get_indexer(_names(sub[grid_fields[1]]))]
+    x1, y1, x2, y2 = a.T
+    x3, y3, x4, y4 = n.T
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
+        t = ((x1 - x3) * (y3 - y4) - (y1 - y3) * (x3 - x4)) / denom
+        t[np.abs(denom) < 1e-10] = np.nan  # parallel lines
+
+    return pd.DataFrame({"place_x": x1 + t * (x2 - x1), "place_y": y1 + t * (y2 - y1)}, index=sub.index)
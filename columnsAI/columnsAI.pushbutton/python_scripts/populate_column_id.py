@@ -2,30 +2,191 @@
 Utility to populate column_id field in columns dataframe.
 column_id format: {alpha_grid}{numeric_grid}-{base_level}{top_level}
 Example: A1-L0L1
+
+The same helpers build the ids of the other element tables from their
+category's id format (see categories.py), e.g. beam_id "B:2-4-L5".
+
+A key index (<table>_ids.npz next to the table) keeps a hash of each id's
+key fields between loads, so only new rows and rows whose keys were edited
+need their id rebuilt.
 """
+import os
+import string
+
+import numpy as np
 import pandas as pd
 
+ID_FORMAT = "{alpha_grid}{numeric_grid}-{base_level}{top_level}"
+KEY_FIELDS = ["alpha_grid", "numeric_grid", "base_level", "top_level"]
+
+
+def _id_text(values):
+    """Field values as id text; whole floats (numeric grids with gaps) lose the .0"""
+    if pd.api.types.is_float_dtype(values) and values.dropna().mod(1).eq(0).all():
+        values = values.astype("Int64")
+    return values.astype(str)
+
 
-def populate_column_id(df):
+def format_column_ids(df, id_format=ID_FORMAT):
     """
-    Add or update column_id field in the dataframe.
+    Build ids from the key fields.
 
     Args:
-        df: pandas DataFrame with columns: alpha_grid, numeric_grid, base_level, top_level
+        df: pandas DataFrame (or row subset) with the fields named in id_format
+        id_format: Id template (default: {alpha_grid}{numeric_grid}-{base_level}{top_level})
 
     Returns:
-        DataFrame with column_id populated
+        Series of ids aligned with df
+    """
+    ids = pd.Series("", index=df.index, dtype=object)
+    for literal, field, _, _ in string.Formatter().parse(id_format):
+        if literal:
+            ids = ids + literal
+        if field:
+            ids = ids + _id_text(df[field])
+    return ids
+
+
+def key_hashes(df, key_fields=KEY_FIELDS):
+    """
+    uint64 hash of each row's key fields. Numbers are hashed as float64, so
+    the hash doesn't change with the dtype a numeric grid is loaded as.
+    """
+    keys = df[key_fields].copy()
+    for field in key_fields:
+        if pd.api.types.is_numeric_dtype(keys[field]):
+            keys[field] = keys[field].astype("float64")
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+
+def load_key_index(path):
+    """
+    Key index saved by the last load of a table: Series of key hashes by id,
+    or None if there is none (or it can't be read).
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    try:
+        with np.load(path) as data:
+            known = pd.Series(data["hashes"], index=data["ids"])
+    except (OSError, ValueError, KeyError):
+        return None
+    return known[~known.index.duplicated()]
+
+
+def save_key_index(path, ids, hashes):
+    """Save the id -> key hash index of a table (replaced atomically)."""
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+        np.savez(f, ids=np.asarray(ids, dtype=str), hashes=hashes)
+    os.replace(tmp_path, path)
+
+
+def populate_column_id(df, id_field="column_id", id_format=ID_FORMAT, key_fields=KEY_FIELDS, index_path=None):
+    """
+    Fill the id where it is missing or no longer matches the row's key fields.
+
+    With index_path, the hash of each row's key fields is kept per id in a
+    file from one load to the next, and only rows whose id is new or whose
+    keys changed since (e.g. numeric_grid 1 -> 5 on A1-L0L1) are compared
+    with the id their keys give; rebuilt where it differs. Without an index
+    every row is compared. Every other row keeps its id.
+
+    Args:
+        df: pandas DataFrame with the key fields (alpha_grid, numeric_grid, base_level, top_level)
+        id_field: Id column (column_id, beam_id, ...)
+        id_format: Id template of the table's category
+        key_fields: Fields the id is built from
+        index_path: Key index file of the table (see load_key_index), optional
+
+    Returns:
+        DataFrame with the id populated
     """
-    df["column_id"] = (
-        df["alpha_grid"].astype(str)
-        + df["numeric_grid"].astype(str)
-        + "-"
-        + df["base_level"].astype(str)
-        + df["top_level"].astype(str)
-    )
+    hashes = key_hashes(df, key_fields) if index_path else None
+    if id_field not in df.columns:
+        df[id_field] = format_column_ids(df, id_format)
+        if index_path:
+            save_key_index(index_path, df[id_field], hashes)
+        return df
+
+    ids = df[id_field].astype(object)
+    missing = ids.isna()
+    known = load_key_index(index_path)
+    if known is None:
+        check = ~missing
+    else:
+        # Blank ids aren't in the index either, so they are checked (and rebuilt)
+        positions = known.index.get_indexer(ids.to_numpy())
+        same = (positions >= 0) & (known.to_numpy()[positions] == hashes)
+        check = ~missing & ~same
+
+    needs = missing.copy()
+    if check.any():
+        checked = df.loc[check]
+        needs[check] = ids[check].astype(str).str.strip() != format_column_ids(checked, id_format)
+
+    if needs.any():
+        # An all-empty column reads back as float; ids need a text column
+        if not pd.api.types.is_string_dtype(df[id_field]) or isinstance(df[id_field].dtype, pd.CategoricalDtype):
+            df[id_field] = ids
+        df.loc[needs, id_field] = format_column_ids(df.loc[needs], id_format)
+    if index_path and (known is None or needs.any() or check.any() or len(known) != len(df)):
+        save_key_index(index_path, df[id_field].astype(str), hashes)
     return df
 
 
+class ColumnIndex(object):
+    """
+    Hash index from id (column_id by default) to row label.
+
+    Built in one pass over the table; duplicate ids are recorded while
+    building, so uniqueness is checked for free.
+    """
+
+    def __init__(self, df, id_field="column_id", key_fields=KEY_FIELDS):
+        self.id_field = id_field
+        self.key_fields = key_fields
+        self.rows = {}
+        self.duplicates = {}
+        for cid, label in zip(df[id_field].astype(str), df.index):
+            self._insert(cid, label)
+
+    def _insert(self, cid, label):
+        if cid in self.rows:
+            self.duplicates.setdefault(cid, [self.rows[cid]]).append(label)
+        else:
+            self.rows[cid] = label
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __contains__(self, cid):
+        return cid in self.rows
+
+    def get(self, cid):
+        """Row label for a column_id, or None"""
+        return self.rows.get(cid)
+
+    def problems(self, df, limit=10):
+        """
+        Describe duplicate ids. Rows sharing an id and all key fields are
+        duplicates; rows sharing an id with different keys are collisions
+        (e.g. grid "A1" + "1" and grid "A" + "11" both give "A11-...").
+
+        Returns:
+            List of problem strings (empty if every column_id is unique)
+        """
+        problems = []
+        for cid, labels in list(self.duplicates.items())[:limit]:
+            keys = df.loc[labels, self.key_fields].astype(str).drop_duplicates()
+            kind = "duplicate {}" if len(keys) == 1 else "{} collision"
+            kind = kind.format(self.id_field)
+            problems.append("{}: {} ({} rows)".format(kind, cid, len(labels)))
+        if len(self.duplicates) > limit:
+            problems.append("... and {} more duplicated ids".format(len(self.duplicates) - limit))
+        return problems
+
+
 def populate_column_id_file(input_path, output_path=None):
     """
     Read CSV, populate column_id, and write back.
@@ -56,3 +217,7 @@ if __name__ == "__main__":
     df = populate_column_id_file(input_file)
     print(f"Populated column_id for {len(df)} rows")
     print(f"Updated: {input_file}")
+
+    problems = ColumnIndex(df).problems(df)
+    for problem in problems:
+        print(f"WARNING: {problem}")
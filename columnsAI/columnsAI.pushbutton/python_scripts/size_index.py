@@ -0,0 +1,65 @@
+"""
+Numeric dimensions of section size strings.
+
+Sizes are stored as Revit type names: "500mm" (square concrete), "400x600mm"
+(rectangular, width x depth) or steel designations "356x368x177" (depth x
+width x mass per metre, kg/m). parse_size() turns them into numbers so
+queries can compare them ("width": "<450", "mass": "<118"); every distinct
+size string is parsed only once per process.
+"""
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ["width", "depth", "mass"]
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+NONE = (np.nan, np.nan, np.nan)
+
+
+@lru_cache(maxsize=None)
+def parse_size(text):
+    """
+    (width, depth, mass) of a size string, NaN where the string doesn't say.
+
+        "500mm"        -> (500, 500, nan)
+        "400x600mm"    -> (400, 600, nan)
+        "356x368x177"  -> (368, 356, 177)
+    """
+    numbers = [float(n) for n in NUMBER.findall(str(text or "").lower())]
+    if len(numbers) == 1:
+        return (numbers[0], numbers[0], np.nan)
+    if len(numbers) == 2:
+        return (numbers[0], numbers[1], np.nan)
+    if len(numbers) == 3:
+        depth, width, mass = numbers
+        return (width, depth, mass)
+    return NONE
+
+
+def spec_number(text):
+    """Operand of a dimension query, units ignored: "450mm" -> 450.0, "118 kg/m" -> 118.0."""
+    numbers = NUMBER.findall(str(text))
+    if len(numbers) != 1:
+        raise ValueError("not a dimension: {}".format(text))
+    return float(numbers[0])
+
+
+def size_dimensions(values):
+    """
+    Width, depth and mass per row of a size column.
+
+    Categoricals are parsed once per category, anything else once per
+    distinct value.
+
+    Returns:
+        DataFrame with DIMENSIONS columns, aligned with values
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    # Trailing row is picked up by code -1 (missing size)
+    table = np.array([parse_size(u) for u in uniques] + [NONE], dtype=float).reshape(-1, 3)
+    return pd.DataFrame(table[codes], index=values.index, columns=DIMENSIONS)
@@ -0,0 +1,129 @@
+"""
+Fuzzy lookup of family / type names.
+
+Parser output such as "UC 356x368x177", "PT sq" or "600 mm" often differs
+from the Revit names only in case, spacing or separators, or in where the
+family / type split falls. TypeIndex normalizes every known (family, type)
+pair once and indexes its character 3-grams and number tokens, so a queried
+pair is resolved with a dictionary lookup when only the spelling differs,
+and otherwise ranked against the candidates sharing n-grams with it.
+"""
+import re
+from collections import Counter, defaultdict
+
+NGRAM = 3
+NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def compact(text):
+    """Lowercase letters, digits and dots only: "356 x 368 X 177" -> "356x368x177"."""
+    return re.sub(r"[^a-z0-9.]", "", str(text or "").lower())
+
+
+def ngrams(text):
+    """Character n-grams of the compact text, with boundary markers."""
+    padded = "#{}#".format(text)
+    return {padded[i:i + NGRAM] for i in range(max(len(padded) - NGRAM + 1, 1))}
+
+
+def numbers(text):
+    """Numbers in the text, as a multiset (dimensions: 356x368x177 -> 356, 368, 177)."""
+    return Counter(float(n) for n in NUMBER.findall(str(text or "")))
+
+
+def pair_label(family, type_name):
+    """How a pair is shown to the user: "UC - 356x368x177" (walls: just the type)."""
+    return " - ".join(str(part) for part in (family, type_name) if part)
+
+
+class TypeIndex(object):
+    """
+    Index over the known (family, type) pairs of one category.
+
+    Keys:
+      exact   - (family, type) as written
+      split   - compact family and compact type ("uc", "356x368x177")
+      joined  - compact family + type ("uc356x368x177"), for a different split
+    Candidates for anything else come from an inverted 3-gram index and are
+    ranked by 3-gram overlap (Dice) and matching numbers.
+    """
+
+    def __init__(self, pairs):
+        self.pairs = []
+        self.exact = {}
+        self.split = {}
+        self.joined = {}
+        self.postings = defaultdict(set)
+        self._grams = []
+        self._numbers = []
+        for family, type_name in pairs:
+            family = str(family or "").strip()
+            type_name = str(type_name or "").strip()
+            if (family, type_name) in self.exact or not type_name:
+                continue
+            i = len(self.pairs)
+            self.pairs.append((family, type_name))
+            self.exact[(family, type_name)] = i
+            self.split.setdefault((compact(family), compact(type_name)), i)
+            joined = compact(family) + compact(type_name)
+            self.joined.setdefault(joined, i)
+            grams = ngrams(joined)
+            self._grams.append(grams)
+            self._numbers.append(numbers(family + " " + type_name))
+            for gram in grams:
+                self.postings[gram].add(i)
+
+    @classmethod
+    def for_category(cls, table, category, manifest=None):
+        """
+        Index for one category. The model manifest is the authority where it
+        lists the category's types (manifests exported before it kept the
+        Revit spelling list lowercase names, so the table's spelling is used
+        where one matches); otherwise the pairs already in the table are
+        indexed.
+        """
+        family_field, type_field = category.family_field, category.type_field
+        families = table[family_field].astype(str) if family_field else [""] * len(table)
+        table_pairs = sorted(set(zip(families, table[type_field].astype(str))))
+
+        types = manifest.get(category.manifest_types) if manifest and category.manifest_types else None
+        if types is None:
+            return cls(table_pairs)
+        spelling = {(f.lower(), t.lower()): (f, t) for f, t in table_pairs}
+        return cls(spelling.get((f.lower(), t.lower()), (f, t)) for f, t in types)
+
+    def __len__(self):
+        return len(self.pairs)
+
+    def __contains__(self, pair):
+        return pair in self.exact
+
+    def lookup(self, family, type_name):
+        """Known pair that differs from the query only in spelling, or None."""
+        i = self.split.get((compact(family), compact(type_name)))
+        if i is None:
+            i = self.joined.get(compact(family) + compact(type_name))
+        return self.pairs[i] if i is not None else None
+
+    def rank(self, family, type_name, limit=3):
+        """Best matching known pairs: [((family, type), score 0-1), ...], best first."""
+        joined = compact(family) + compact(type_name)
+        grams = ngrams(joined)
+        wanted = numbers(str(family) + " " + str(type_name))
+        candidates = set()
+        for gram in grams:
+            candidates |= self.postings.get(gram, set())
+
+        scored = []
+        for i in candidates:
+            dice = 2.0 * len(grams & self._grams[i]) / (len(grams) + len(self._grams[i]))
+            have = self._numbers[i]
+            if wanted or have:
+                shared = sum((wanted & have).values())
+                total = sum((wanted | have).values())
+                score = 0.6 * dice + 0.4 * shared / total
+            else:
+                score = dice
+            scored.append((round(score, 3), self.pairs[i]))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [(pair, score) for score, pair in scored[:limit]]
@@ -7,12 +7,24 @@ PYTHON_SCRIPTS_DIR = os.path.join(SCRIPT_DIR, "python_scripts")
 sys.path.insert(0, SCRIPT_DIR)
 sys.path.insert(0, PYTHON_SCRIPTS_DIR)
 
+import cProfile
+import hashlib
+import io
 import json
+import pstats
 import shutil
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+import numpy as np
 import pandas as pd
 from ai_parser import parse_request
-from populate_column_id import populate_column_id
+from categories import CATEGORIES, get_category, category_of, ALPHA, DIMENSION, LEVEL, NUMBER
+from populate_column_id import populate_column_id, ColumnIndex
+from model_manifest import load_manifest, validate_changes, placement_points
+from type_index import TypeIndex, pair_label
+from size_index import size_dimensions, spec_number
 
 # =============================================================================
 # CONFIGURATION
@@ -22,6 +34,13 @@ COLUMNS_FILE = os.path.join(SCRIPT_DIR, "columns.csv")
 BACKUP_DIR = os.path.join(SCRIPT_DIR, "backups")
 LOG_DIR = os.path.join(SCRIPT_DIR, "log")
 PROMPT_FILE = os.path.join(SCRIPT_DIR, "user_input.txt")
+MANIFEST_FILE = os.path.join(SCRIPT_DIR, "model_manifest.json")   # exported by columns.py
+UNCHANGED_FILE = os.path.join(SCRIPT_DIR, "unchanged_runs.json")   # see known_unchanged()
+MAX_UNCHANGED = 200        # (table, operations) fingerprints remembered there
+NO_CHANGES_MARKER = "NO_CHANGES: "   # script.py skips the sync for these tables
+
+# Revit ids recorded by the sync; kept as text so they never turn into floats
+ID_DTYPES = {"element_id": str, "unique_id": str}
 if not os.path.exists(LOG_DIR):
     os.makedirs(LOG_DIR)
 if not os.path.exists(BACKUP_DIR):
@@ -30,27 +49,80 @@ if not os.path.exists(BACKUP_DIR):
 # =============================================================================
 # LOGGING & BACKUP
 # =============================================================================
-def write_log(log_entry):
-    log_filename = datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
-    log_path = os.path.join(LOG_DIR, log_filename)
+def write_log(log_entry, suffix=None):
+    log_filename = datetime.now().strftime("%Y%m%d_%H%M%S")
+    if suffix:
+        log_filename += "_" + suffix
+    log_path = os.path.join(LOG_DIR, log_filename + ".json")
+    # Runs finishing in the same second must not overwrite each other's log
+    n = 1
+    while os.path.exists(log_path):
+        n += 1
+        log_path = os.path.join(LOG_DIR, "{}_{}.json".format(log_filename, n))
     with open(log_path, "w") as f:
         json.dump(log_entry, f, indent=2)
     return log_path
 
 
 def create_backup(file_path):
-    """Create a timestamped backup of the columns file."""
+    """Create a timestamped backup of a column table (e.g. columns_backup_<time>.csv)."""
     if not os.path.isfile(file_path):
         return None
 
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_filename = "columns_backup_{}.csv".format(timestamp)
-    backup_path = os.path.join(BACKUP_DIR, backup_filename)
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    backup_filename = "{}_backup_{}".format(stem, timestamp)
+    backup_path = os.path.join(BACKUP_DIR, backup_filename + ".csv")
+    # Never overwrite an earlier backup taken in the same second
+    n = 1
+    while os.path.exists(backup_path):
+        n += 1
+        backup_path = os.path.join(BACKUP_DIR, "{}_{}.csv".format(backup_filename, n))
 
     shutil.copy2(file_path, backup_path)
     print("Backup created: {}".format(backup_path))
     return backup_path
 
+# =============================================================================
+# TABLE
+# =============================================================================
+def load_table(path, category=None):
+    """
+    Load an element table in its compact form: categoricals for the repeated
+    text fields (categories sorted, so alpha_grid ranges work on codes) and
+    small ints for numeric grids. Ids are unique per row, so they stay plain text.
+    """
+    category = get_category(category)
+    dtypes = dict(ID_DTYPES)
+    dtypes.update({field: "category" for field in category.category_fields})
+    df = pd.read_csv(path, dtype=dtypes)
+
+    for field in category.category_fields:
+        if field in df.columns:
+            df[field] = df[field].cat.set_categories(sorted(df[field].cat.categories))
+
+    for field in category.numeric_fields:
+        numeric = pd.to_numeric(df[field], errors="coerce")
+        df[field] = numeric.astype("int16") if numeric.notna().all() else numeric.astype("float32")
+    return df
+
+
+def set_values(df, mask, field, value):
+    """Assign value to field on the masked rows, adding it as a category if needed."""
+    col = df[field]
+    if isinstance(col.dtype, pd.CategoricalDtype) and value not in col.cat.categories:
+        df[field] = col.cat.add_categories([value])
+    df.loc[mask, field] = value
+
+
+def changed_cells(before, after):
+    """Element-wise before != after for one field, compared on codes for categoricals."""
+    if isinstance(after.dtype, pd.CategoricalDtype) and isinstance(before.dtype, pd.CategoricalDtype):
+        # after only ever gains categories, so recode before onto them
+        before = before.cat.set_categories(after.cat.categories)
+        return pd.Series(before.cat.codes.values != after.cat.codes.values, index=after.index)
+    return before != after
+
 # =============================================================================
 # FILTER LOGIC
 # =============================================================================
@@ -61,63 +133,430 @@ def extract_level_number(level_str):
         return int(s[1:])
     return int(s)
 
-def get_filter_mask(df, query):
+def level_numbers(df, field="base_level"):
+    """Numeric level per row; parsed once per distinct level, not per row."""
+    col = df[field]
+    if not isinstance(col.dtype, pd.CategoricalDtype):
+        return col.apply(extract_level_number)
+    # Trailing -1 is picked up by code -1 (missing level)
+    numbers = np.array([extract_level_number(c) for c in col.cat.categories] + [-1])
+    return pd.Series(numbers[col.cat.codes.values], index=df.index)
+
+def category_range(col, lo, hi):
+    """lo <= col <= hi for a categorical with sorted categories, on codes."""
+    cats = col.cat.categories
+    lo_code = cats.searchsorted(lo, side="left")
+    hi_code = cats.searchsorted(hi, side="right") - 1
+    codes = col.cat.codes
+    return (codes >= lo_code) & (codes <= hi_code)
+
+def compare_numbers(values, spec, number=int):
+    """
+    Mask for a numeric comparison: "5", ">5", ">=5", "<3", "<=3" or "2-5".
+    number parses the operands (size_index.spec_number for dimensions).
+    """
+    spec = str(spec).strip()
+    if spec.startswith(">="):
+        return values >= number(spec[2:])
+    if spec.startswith(">"):
+        return values > number(spec[1:])
+    if spec.startswith("<="):
+        return values <= number(spec[2:])
+    if spec.startswith("<"):
+        return values < number(spec[1:])
+    if "-" in spec:
+        lo, hi = [number(p.strip()) for p in spec.split("-")]
+        return (values >= lo) & (values <= hi)
+    return values == number(spec)
+
+def get_filter_mask(df, query, category=None):
+    """Rows matching every query key; keys the category doesn't know are ignored."""
+    category = get_category(category)
     mask = pd.Series([True] * len(df), index=df.index)
 
-    # Create numeric level column for comparisons
-    df_level_num = df["base_level"].apply(extract_level_number)
-
-    if "level" in query:
-        level_val = str(query["level"]).strip()
-        if level_val.startswith(">="):
-            mask &= df_level_num >= int(level_val[2:])
-        elif level_val.startswith(">"):
-            mask &= df_level_num > int(level_val[1:])
-        elif level_val.startswith("<="):
-            mask &= df_level_num <= int(level_val[2:])
-        elif level_val.startswith("<"):
-            mask &= df_level_num < int(level_val[1:])
-        elif "-" in level_val:
-            parts = [p.strip() for p in level_val.split("-")]
-            mask &= df_level_num >= int(parts[0])
-            mask &= df_level_num <= int(parts[1])
+    for key, value in query.items():
+        if key not in category.query_fields:
+            continue
+        field, kind = category.query_fields[key]
+        col = df[field]
+
+        if kind == LEVEL:
+            mask &= compare_numbers(level_numbers(df, field), value)
+        elif kind == NUMBER:
+            mask &= compare_numbers(col, value)
+        elif kind == DIMENSION:
+            mask &= compare_numbers(size_dimensions(col)[key], value, number=spec_number)
+        elif kind == ALPHA and "-" in str(value):
+            lo, hi = [p.strip() for p in str(value).split("-")]
+            if isinstance(col.dtype, pd.CategoricalDtype):
+                mask &= category_range(col, lo, hi)
+            else:
+                mask &= (col >= lo) & (col <= hi)
         else:
-            mask &= df_level_num == int(level_val)
-
-    if "type" in query:
-        mask &= df["column_type"] == query["type"]
+            mask &= col == str(value).strip()
 
-    if "size" in query:
-        mask &= df["size"] == query["size"]
+    return mask
 
-    if "alpha" in query:
-        alpha_val = str(query["alpha"]).strip()
-        if "-" in alpha_val:
-            lo, hi = [p.strip() for p in alpha_val.split("-")]
-            mask &= df["alpha_grid"] >= lo
-            mask &= df["alpha_grid"] <= hi
-        else:
-            mask &= df["alpha_grid"] == alpha_val
-
-    if "numeric" in query:
-        numeric_val = str(query["numeric"]).strip()
-        if "-" in numeric_val:
-            lo, hi = [p.strip() for p in numeric_val.split("-")]
-            mask &= df["numeric_grid"] >= int(lo)
-            mask &= df["numeric_grid"] <= int(hi)
+# =============================================================================
+# CHANGES
+# =============================================================================
+def apply_operations(table, ops, category=None):
+    """
+    Apply parsed operations to the table in place. The category's change_fields
+    map the parser's change keys to table fields.
+
+    Returns:
+        One log dict per operation
+    """
+    category = get_category(category)
+    op_logs = []
+    for op in ops:
+        query = op.get("query", {})
+        change = op.get("change", {})
+
+        mask = get_filter_mask(table, query, category)
+        filtered_count = int(mask.sum())
+
+        op_logs.append({
+            "query": query,
+            "change": change,
+            "matched_count": filtered_count,
+        })
+
+        # Apply changes
+        for key, field in category.change_fields.items():
+            if key in change:
+                set_values(table, mask, field, change[key])
+
+    return op_logs
+
+
+def resolve_type_names(table, before, category, index, limit=3):
+    """
+    Match the (family, type) pairs the operations wrote against the known
+    types. Pairs that differ only in spelling ("UC 356x368x177", "600 mm")
+    are rewritten to the known names (never to a lowercased copy); the
+    others are returned with their ranked closest candidates.
+
+    Returns:
+        {"resolved": [{"from", "to", "rows"}], "unresolved": [{"pair", "rows", "candidates"}]}
+    """
+    result = {"resolved": [], "unresolved": []}
+    fields = [f for f in (category.family_field, category.type_field) if f]
+    touched = pd.Series(False, index=table.index)
+    for field in fields:
+        touched |= changed_cells(before[field], table[field])
+    if not touched.any() or not len(index):
+        return result
+
+    sub = pd.DataFrame({
+        "family": table.loc[touched, category.family_field].astype(str) if category.family_field else "",
+        "type": table.loc[touched, category.type_field].astype(str),
+    })
+    for (family, type_name), group in sub.groupby(["family", "type"], sort=True):
+        if (family, type_name) in index:
+            continue
+        known = index.lookup(family, type_name)
+        if known and known == (family.lower(), type_name.lower()):
+            # Lowercase name from an older manifest: Revit matches types
+            # case-insensitively, and "UC" -> "uc" would break later "type" queries
+            continue
+        if known:
+            rows = table.index.isin(group.index)
+            if category.family_field:
+                set_values(table, rows, category.family_field, known[0])
+            set_values(table, rows, category.type_field, known[1])
+            result["resolved"].append({"from": pair_label(family, type_name), "to": pair_label(*known),
+                                       "rows": int(len(group))})
         else:
-            mask &= df["numeric_grid"] == int(numeric_val)
+            result["unresolved"].append({
+                "pair": pair_label(family, type_name),
+                "rows": int(len(group)),
+                "candidates": [[pair_label(*pair), score] for pair, score in index.rank(family, type_name, limit)],
+            })
+    return result
+
+
+def format_unresolved(item):
+    """One line for a type name that matched no known type, with its candidates."""
+    closest = ", ".join("{} ({:.2f})".format(label, score) for label, score in item["candidates"])
+    return "unknown family/type: {} ({} rows); closest: {}".format(item["pair"], item["rows"], closest or "none")
+
+
+def summarize_changes(before, after, category=None, max_ids=10):
+    """
+    Compare two versions of the table row by row.
+
+    Returns:
+        (changed_mask, summary) where summary holds the changed row count,
+        "old -> new" transition counts per field and a few example ids
+    """
+    category = get_category(category)
+    changed = pd.Series(False, index=after.index)
+    transitions = {}
+    for field in sorted(set(category.change_fields.values())):
+        diff = changed_cells(before[field], after[field])
+        changed |= diff
+        if diff.any():
+            pairs = before.loc[diff, field].astype(str) + " -> " + after.loc[diff, field].astype(str)
+            transitions[field] = {k: int(v) for k, v in pairs.value_counts().items()}
+
+    summary = {
+        "changed_rows": int(changed.sum()),
+        "transitions": transitions,
+        "example_ids": after.loc[changed, category.id_field].astype(str).head(max_ids).tolist(),
+    }
+    return changed, summary
+
+
+def format_preview(log_entry):
+    """Compact, human readable preview of a dry run."""
+    lines = []
+    for i, op in enumerate(log_entry["operations"], 1):
+        lines.append("Op {}: {} -> {} ({} matched)".format(
+            i, json.dumps(op["query"]), json.dumps(op["change"]), op["matched_count"]))
+
+    changes = log_entry.get("changes", {})
+    resolved = log_entry.get("type_names", {}).get("resolved", [])
+    if resolved:
+        lines.append("")
+        lines.append("Type names matched:")
+        for item in resolved:
+            lines.append("  {} -> {} ({} rows)".format(item["from"], item["to"], item["rows"]))
+    warnings = log_entry.get("warnings", [])
+    if warnings:
+        lines.append("")
+        lines.append("Warnings:")
+        for warning in warnings:
+            lines.append("  " + warning)
+    problems = log_entry.get("validation", {}).get("problems", [])
+    if problems:
+        lines.append("")
+        lines.append("Rejected by model manifest:")
+        for problem in problems:
+            lines.append("  " + problem)
+    lines.append("")
+    lines.append("Rows changed: {} of {}".format(changes.get("changed_rows", 0), log_entry["total_count"]))
+    for field, counts in changes.get("transitions", {}).items():
+        for pair, count in counts.items():
+            lines.append("  {}: {} (x{})".format(field, pair, count))
+    if changes.get("example_ids"):
+        lines.append("  e.g. {}".format(", ".join(changes["example_ids"])))
+    return "\n".join(lines)
 
-    return mask
+# =============================================================================
+# SYNC HANDOFF
+# =============================================================================
+# Marker line that script.py looks for on stdout
+PAYLOAD_MARKER = "SYNC_PAYLOAD: "
+
+# Progress lines shown live by script.py ("STAGE: Parsing request")
+STAGE_MARKER = "STAGE: "
+
+
+def _cell_str(value):
+    """Format a cell the way it would read back from the CSV."""
+    if pd.isna(value):
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def build_sync_payload(table, changed, points=None, manifest_hash=None, category=None):
+    """
+    Serialize the changed rows for the pyRevit side.
+
+    Args:
+        points: Optional place_x / place_y frame from placement_points(), added
+                as extra fields; only valid for the manifest with manifest_hash
+        category: Category of the table (tells script.py which sync adapter to use)
+
+    Returns:
+        {"fields": [...], "rows": [[...], ...], "partial": True, "manifest_hash": ..., "category": ...}
+        Rows are strings, exactly as csv.DictReader would have produced them.
+    """
+    subset = table.loc[changed]
+    if points is not None:
+        subset = subset.join(points)
+    fields = [str(c) for c in subset.columns]
+    rows = [[_cell_str(v) for v in row] for row in subset.itertuples(index=False, name=None)]
+    return {"fields": fields, "rows": rows, "partial": True, "manifest_hash": manifest_hash,
+            "category": get_category(category).name}
+
+
+def report_stage(name):
+    """Announce the current pipeline stage to script.py's progress window."""
+    print(STAGE_MARKER + name)
+    sys.stdout.flush()
+
+
+def emit_sync_payload(payload):
+    """Print the payload as one compact JSON line and flush it immediately."""
+    print(PAYLOAD_MARKER + json.dumps(payload, separators=(",", ":")))
+    sys.stdout.flush()
+
+
+# Printed when a speculative run (--await-confirm) has its result ready and
+# waits for script.py to answer "commit" or "abort" on stdin
+CONFIRM_MARKER = "AWAITING_CONFIRM"
+
+
+def confirm_from_stdin():
+    """
+    Block until the caller answers on stdin. "commit" goes ahead; anything
+    else, including a closed pipe, discards the run.
+    """
+    report_stage("Waiting for confirmation")
+    print(CONFIRM_MARKER)
+    sys.stdout.flush()
+    return sys.stdin.readline().strip().lower() == "commit"
+
+
+# =============================================================================
+# IDEMPOTENCE
+# =============================================================================
+def table_fingerprint(table):
+    """Hash of the table's columns and cell values (as loaded; the order of categories doesn't matter)."""
+    digest = hashlib.sha1(",".join(table.columns).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def ops_fingerprint(ops):
+    """Hash of the operations with their keys sorted and their values' whitespace normalized."""
+    def clean(d):
+        return {str(k).strip(): " ".join(str(v).split()) for k, v in (d or {}).items()}
+    normalized = [{"query": clean(op.get("query")), "change": clean(op.get("change"))} for op in ops]
+    return hashlib.sha1(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _unchanged_key(fingerprint):
+    return "{}:{}".format(fingerprint["table"], fingerprint["operations"])
+
+
+def known_unchanged(fingerprint):
+    """True if these operations were applied to this exact table before and changed no cell."""
+    try:
+        with open(UNCHANGED_FILE, "r", encoding="utf-8") as f:
+            return _unchanged_key(fingerprint) in json.load(f)
+    except (OSError, ValueError):
+        return False
+
+
+def remember_unchanged(fingerprint):
+    """Record a (table, operations) pair that changed nothing; keeps the latest MAX_UNCHANGED."""
+    try:
+        with open(UNCHANGED_FILE, "r", encoding="utf-8") as f:
+            keys = [k for k in json.load(f) if k != _unchanged_key(fingerprint)]
+    except (OSError, ValueError):
+        keys = []
+    keys = (keys + [_unchanged_key(fingerprint)])[-MAX_UNCHANGED:]
+    # Replace atomically: pool workers may record at the same time
+    tmp_path = "{}.{}.tmp".format(UNCHANGED_FILE, os.getpid())
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(keys, f)
+    os.replace(tmp_path, UNCHANGED_FILE)
+
+
+def report_unchanged(entry):
+    """Mark a table entry as unchanged and tell script.py there is nothing to sync for it."""
+    entry["status"] = "unchanged"
+    print("{}{}".format(NO_CHANGES_MARKER, entry["table"]))
+    print("No changes ({}): the table already matches the request".format(os.path.basename(entry["table"])))
+    return entry
 
 # =============================================================================
 # PIPELINE
 # =============================================================================
-def run_pipeline(user_text):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    log_entry = {
-        "timestamp": timestamp,
-        "input": user_text,
+def category_table(category):
+    """Table CSV of a category for the open model (columns.csv, beams.csv, ...)."""
+    return os.path.join(SCRIPT_DIR, get_category(category).table)
+
+
+def manifest_file_for(table_path):
+    """
+    Manifest exported for a table's model: model_manifest.json for the tables
+    next to columns.csv, <stem>_manifest.json next to any other column table.
+    """
+    if os.path.dirname(os.path.abspath(table_path)) == os.path.dirname(os.path.abspath(COLUMNS_FILE)):
+        return MANIFEST_FILE
+    return os.path.splitext(table_path)[0] + "_manifest.json"
+
+
+def id_index_file_for(table_path):
+    """Key index of a table's ids (populate_column_id), e.g. columns_ids.npz next to columns.csv."""
+    return os.path.splitext(table_path)[0] + "_ids.npz"
+
+
+def prepare_table(table_path, category=None):
+    """
+    Everything about a table that does not depend on the parsed request:
+    load it, populate and check its ids and load the model manifest.
+    run_pipeline runs this on a thread while the request is being parsed.
+    The backup is only copied once the table is about to be written, so a
+    run cancelled or killed before that leaves none behind.
+
+    Returns:
+        {"table", "memory_bytes", "manifest", "ms"}
+
+    Raises:
+        IOError if the table is missing, ValueError if its ids are not unique
+    """
+    category = get_category(category)
+    t0 = time.perf_counter()
+    if not os.path.isfile(table_path):
+        raise IOError("{} table not found: {}".format(category.name.capitalize(), table_path))
+
+    table = load_table(table_path, category)
+    memory_bytes = int(table.memory_usage(deep=True).sum())
+
+    # Give new rows an id, then index the ids; Mark is the unique key in
+    # Revit, so duplicates must be caught before anything reaches the sync
+    table = populate_column_id(table, id_field=category.id_field, id_format=category.id_format,
+                               key_fields=category.key_fields, index_path=id_index_file_for(table_path))
+    index = ColumnIndex(table, category.id_field, category.key_fields)
+    id_problems = index.problems(table)
+    if id_problems:
+        raise ValueError("{} is not unique:\n  ".format(category.id_field) + "\n  ".join(id_problems))
+
+    return {
+        "table": table,
+        "memory_bytes": memory_bytes,
+        "manifest": load_manifest(manifest_file_for(table_path)),
+        "ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+
+def process_table(table_path, ops, dry_run=False, emit=False, confirm=None, category=None, prefetched=None):
+    """
+    Apply parsed operations to one element table.
+
+    Runs in a worker process when several tables are processed at once, so
+    it only takes and returns plain (picklable) data.
+
+    Args:
+        table_path: Table CSV
+        ops: Parsed operations on this table's category
+        dry_run: Compute the changes only; no backup, no write
+                 (otherwise a table the operations don't change is reported
+                 as "unchanged" and left alone, without asking confirm)
+        emit: Print the sync payload here (single-table runs). Otherwise it
+              is returned under "payload". Either way the CSV is written
+              before returning; script.py syncs once the process has exited.
+        confirm: Callable asked before anything is written (backup included);
+                 if it returns False the table is left untouched
+        category: Category name of the table (default: columns)
+        prefetched: Future of prepare_table() for this table, started before
+                    the request was parsed (single-model runs)
+
+    Returns:
+        Log entry for the table
+    """
+    category = get_category(category)
+    entry = {
+        "table": table_path,
+        "category": category.name,
         "operations": [],
         "total_count": 0,
         "status": "started",
@@ -125,61 +564,279 @@ def run_pipeline(user_text):
     }
 
     try:
-        if not os.path.isfile(COLUMNS_FILE):
-            raise IOError("Columns CSV not found: {}".format(COLUMNS_FILE))
-
-        # Create backup before processing
-        backup_path = create_backup(COLUMNS_FILE)
-        log_entry["backup_file"] = backup_path
+        # Load CSV (usually already done while the request was parsed)
+        if prefetched is None:
+            report_stage("Loading {}".format(os.path.basename(table_path)))
+            prepared = prepare_table(table_path, category)
+        else:
+            t0 = time.perf_counter()
+            prepared = prefetched.result()
+            entry["load_wait_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        entry["load_ms"] = prepared["ms"]
+        entry["memory_bytes"] = prepared["memory_bytes"]
+        table = prepared["table"]
+        manifest = prepared["manifest"]
+        entry["total_count"] = int(len(table))
+
+        # A rerun of operations that already found nothing to change on this
+        # exact table: no backup, no write, no sync
+        entry["fingerprint"] = {"table": table_fingerprint(table), "operations": ops_fingerprint(ops)}
+        if not dry_run and known_unchanged(entry["fingerprint"]):
+            entry["changes"] = {"changed_rows": 0, "transitions": {}, "example_ids": []}
+            entry["unchanged_by"] = "fingerprint"
+            return report_unchanged(entry)
 
-        # Load CSV
-        columns = pd.read_csv(COLUMNS_FILE)
+        # Apply each operation
+        before = table.copy()
+        entry["operations"] = apply_operations(table, ops, category)
+
+        # Correct type names that differ from a known type only in spelling and
+        # flag the rest with their closest candidates. Known types come from the
+        # manifest where it lists them (then unknown names block the write),
+        # otherwise from the table itself (then they are only warnings).
+        type_index = TypeIndex.for_category(before, category, manifest)
+        entry["type_names"] = resolve_type_names(table, before, category, type_index)
+        type_problems = [format_unresolved(item) for item in entry["type_names"]["unresolved"]]
+        types_checked = bool(manifest and category.manifest_types and category.manifest_types in manifest)
+        if type_problems and not types_checked:
+            entry["warnings"] = type_problems
+            for warning in type_problems:
+                print("Warning ({}): {}".format(os.path.basename(table_path), warning))
+        changed, entry["changes"] = summarize_changes(before, table, category)
+        if not dry_run and not entry["changes"]["changed_rows"]:
+            remember_unchanged(entry["fingerprint"])
+            entry["unchanged_by"] = "comparison"
+            return report_unchanged(entry)
+
+        # Validate against the model before anything is written
+        report_stage("Checking changes")
+        points = None
+        if manifest:
+            t0 = time.perf_counter()
+            problems = validate_changes(table, changed, manifest, category, check_types=False)
+            if types_checked:
+                problems = type_problems + problems
+            if category.point_fields:
+                points = placement_points(table, changed, manifest, category.point_fields)
+                if not problems and points["place_x"].isna().any():
+                    problems.append("grid intersection failed ({} rows)".format(int(points["place_x"].isna().sum())))
+            entry["validation"] = {
+                "manifest_hash": manifest.get("hash"),
+                "problems": problems,
+                "ms": round((time.perf_counter() - t0) * 1000, 2),
+            }
+            if problems and not dry_run:
+                raise ValueError("Changes rejected by model manifest:\n  " + "\n  ".join(problems))
+
+        if dry_run:
+            entry["status"] = "preview"
+            return entry
+
+        # Everything up to here is speculative; nothing is written before the go-ahead
+        if confirm is not None and not confirm():
+            entry["status"] = "cancelled"
+            return entry
+
+        # Create backup before writing
+        report_stage("Writing")
+        entry["backup_file"] = create_backup(table_path)
+
+        # Operations only edit type / size fields, never the id key fields, so
+        # the ids and their index are still valid here
+
+        # Persist the table, then hand the changed rows straight to the sync (no
+        # CSV re-read); a table that couldn't be written (e.g. open in Excel)
+        # must not reach the sync
+        table.to_csv(table_path, index=False)
+        if emit:
+            print("Output saved to: {}".format(table_path))
+        payload = build_sync_payload(table, changed, points, manifest.get("hash") if manifest else None, category)
+        payload["table"] = table_path
+        # script.py restores the backup if the sync doesn't commit, and forgets
+        # "unchanged" fingerprints of the table as written
+        payload["backup_file"] = entry["backup_file"]
+        payload["fingerprint"] = table_fingerprint(table)
+        if emit:
+            emit_sync_payload(payload)
+        else:
+            entry["payload"] = payload
+        entry["status"] = "completed"
 
-        # Populate column_id before processing (ensures all existing columns have IDs)
-        columns = populate_column_id(columns)
-        log_entry["total_count"] = int(len(columns))
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = str(e)
+
+    return entry
+
+
+def format_summary(entries):
+    """Aggregated result of a multi-table run."""
+    lines = []
+    changed = failed = 0
+    for entry in entries:
+        rows = entry.get("changes", {}).get("changed_rows", 0)
+        changed += rows
+        if entry["status"] == "failed":
+            failed += 1
+            lines.append("{}: failed - {}".format(os.path.basename(entry["table"]), entry["error"]))
+        else:
+            lines.append("{}: {}, {} of {} rows changed".format(
+                os.path.basename(entry["table"]), entry["status"], rows, entry["total_count"]))
+    lines.append("Total: {} tables, {} rows changed, {} failed".format(len(entries), changed, failed))
+    return "\n".join(lines)
+
+
+def run_pipeline(user_text, dry_run=False, table_paths=None, confirm=None, prefetch_tables=True):
+    """
+    Parse user_text once and apply it to every table it touches.
+
+    Operations are grouped by category ("category" key, default columns) and
+    each group is applied to its category's table with one vectorized filter
+    pass per operation. Column operations go to table_paths; the other
+    categories use their table next to this script (beams.csv, ...).
+
+    With dry_run=True the changes are computed in memory and printed as a
+    preview: no backup is created and no table is written.
+
+    Otherwise the changed rows of each table are printed as a SYNC_PAYLOAD
+    line for the pyRevit sync, and the tables are written for history.
+    Each table gets its own backup and log entry. Several column tables
+    (one per linked model) are processed in parallel in a process pool; the
+    tables of a single model are processed in this process, one after the other.
+
+    With confirm set, the run is speculative: the request is parsed and the
+    changes computed while the user is still deciding, and confirm() is
+    called before the first write. If it returns False nothing is written.
+
+    For a single model, the tables are loaded and indexed on a thread pool
+    while the request is parsed (unless prefetch_tables is False), so the
+    run takes about max(parse, load) instead of their sum. Backups are only
+    copied for tables being written.
+
+    Tables the operations don't change (same table and operations as an
+    earlier run that changed nothing, by fingerprint, or no cell differs
+    after applying them) are not backed up, written or synced; they print a
+    NO_CHANGES line instead of a payload and the run ends without asking
+    for confirmation if no table changes.
+
+    Args:
+        user_text: Natural language request
+        dry_run: Preview only
+        table_paths: Column table CSVs (default: columns.csv)
+        confirm: Callable returning True to go ahead (e.g. confirm_from_stdin)
+        prefetch_tables: Load the tables while parsing; False loads each one
+                         when it is processed, on this thread (profile_run)
+
+    Returns:
+        The run log entry
+    """
+    tables = list(table_paths or [COLUMNS_FILE])
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_entry = {
+        "timestamp": timestamp,
+        "input": user_text,
+        "dry_run": dry_run,
+        "status": "started",
+        "error": None,
+    }
+    entries = []
+    prefetch = {}
+    loader = None
 
-        # Parse request
+    try:
+        # Start on the tables while the request is in flight: they don't
+        # depend on it. Pool workers (several models) load their own tables.
+        if len(tables) == 1 and prefetch_tables:
+            paths = {name: tables[0] if name == "columns" else category_table(name) for name in CATEGORIES}
+            paths = {name: path for name, path in paths.items() if name == "columns" or os.path.isfile(path)}
+            loader = ThreadPoolExecutor(max_workers=len(paths), thread_name_prefix="prefetch")
+            prefetch = {path: loader.submit(prepare_table, path, name)
+                        for name, path in paths.items()}
+
+        # Parse request (once, whatever the number of tables)
+        report_stage("Parsing request")
+        t0 = time.perf_counter()
         result = parse_request(user_text)
+        log_entry["parse_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+        log_entry["parser_attempts"] = result.pop("attempts", [])
+        log_entry["parser_examples"] = result.pop("examples", [])
         log_entry["ai_response"] = result
 
         ops = result.get("operations", [])
         if not ops:
             raise RuntimeError("AI parsing produced no operations. Parser response: {}".format(result))
 
-        columns["numeric_grid"] = pd.to_numeric(columns["numeric_grid"], errors="coerce")
-
-        # Apply each operation
+        # One job per table: (table path, its operations, category name)
+        by_category = {}
         for op in ops:
-            query = op.get("query", {})
-            change = op.get("change", {})
-
-            mask = get_filter_mask(columns, query)
-            filtered_count = int(mask.sum())
-
-            op_log = {
-                "query": query,
-                "change": change,
-                "matched_count": filtered_count,
-            }
-
-            # Apply changes
-            if change:
-                if "size" in change:
-                    columns.loc[mask, "size"] = change["size"]
-                if "type" in change:
-                    columns.loc[mask, "column_type"] = change["type"]
-
-            log_entry["operations"].append(op_log)
-
-        # Populate column_id after processing (in case new columns were added)
-        columns = populate_column_id(columns)
-
-        # Save output (overwrites original file)
-        columns.to_csv(COLUMNS_FILE, index=False)
-        log_entry["status"] = "completed"
-        print("Output saved to: {}".format(COLUMNS_FILE))
-        print("Backup saved to: {}".format(backup_path))
+            by_category.setdefault(category_of(op), []).append(op)
+        jobs = []
+        for name in sorted(by_category, key=lambda n: (n != "columns", n)):
+            for path in (tables if name == "columns" else [category_table(name)]):
+                jobs.append((path, by_category[name], name))
+        log_entry["categories"] = sorted(by_category)
+
+        # Asked once, before the first write of any table
+        answer = []
+        gate = None
+        if confirm is not None and not dry_run:
+            def gate():
+                if not answer:
+                    t0 = time.perf_counter()
+                    answer.append(confirm())
+                    log_entry["confirm_wait_ms"] = round((time.perf_counter() - t0) * 1000, 2)
+                return answer[0]
+
+        if len(tables) == 1:
+            entries = [process_table(path, job_ops, dry_run, emit=True, confirm=gate, category=name,
+                                     prefetched=prefetch.pop(path, None))
+                       for path, job_ops, name in jobs]
+        elif gate is not None and not gate():
+            # Workers can't wait on stdin; confirm once for all tables
+            entries = [{"table": path, "category": name, "status": "cancelled", "error": None, "total_count": 0}
+                       for path, _, name in jobs]
+        else:
+            paths, job_ops, names = zip(*jobs)
+            n = len(jobs)
+            workers = min(n, os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(process_table, paths, job_ops, [dry_run] * n,
+                                        [False] * n, [None] * n, names))
+            for entry in entries:
+                if "payload" in entry:
+                    emit_sync_payload(entry.pop("payload"))
+
+        for entry in entries:
+            if entry["status"] == "failed":
+                print("Error ({}): {}".format(os.path.basename(entry["table"]), entry["error"]))
+            elif entry.get("backup_file"):
+                print("Backup saved to: {}".format(entry["backup_file"]))
+
+        if dry_run:
+            print("=== PREVIEW ===")
+            for entry in entries:
+                if len(entries) > 1:
+                    print("[{}]".format(os.path.basename(entry["table"])))
+                if entry["status"] == "failed":
+                    print("Error: {}".format(entry["error"]))
+                else:
+                    print(format_preview(entry))
+            print("=== END PREVIEW ===")
+
+        statuses = set(entry["status"] for entry in entries)
+        if statuses == {"cancelled"}:
+            log_entry["status"] = "cancelled"
+            print("Cancelled - nothing was written.")
+        elif statuses == {"unchanged"}:
+            log_entry["status"] = "unchanged"
+            print("No changes - nothing was written.")
+        elif statuses == {"failed"}:
+            log_entry["status"] = "failed"
+            log_entry["error"] = "; ".join(entry["error"] for entry in entries)
+        elif "failed" in statuses:
+            log_entry["status"] = "partially failed"
+        else:
+            log_entry["status"] = "preview" if dry_run else "completed"
 
     except Exception as e:
         log_entry["status"] = "failed"
@@ -187,22 +844,135 @@ def run_pipeline(user_text):
         print("Error: {}".format(e))
 
     finally:
+        if loader is not None:
+            loader.shutdown()
+
         # Always write the log
-        log_path = write_log(log_entry)
+        if len(entries) <= 1:
+            # Single table: one flat log entry, as before
+            for entry in entries:
+                log_entry.update((k, v) for k, v in entry.items() if k not in ("status", "error"))
+            log_path = write_log(log_entry)
+        else:
+            for i, entry in enumerate(entries):
+                model_entry = dict(log_entry, status=entry["status"], error=entry["error"])
+                model_entry.update(entry)
+                entry["log_file"] = write_log(model_entry, suffix="{}_{}".format(
+                    i + 1, os.path.splitext(os.path.basename(entry["table"]))[0]))
+            log_entry["tables"] = [
+                {key: entry.get(key) for key in ("table", "status", "error", "changes", "backup_file", "log_file")}
+                for entry in entries
+            ]
+            log_path = write_log(log_entry, suffix="summary")
+            print("=== SUMMARY ===")
+            print(format_summary(entries))
         print("Log saved to: {}".format(log_path))
+        log_entry["log_file"] = log_path
+
+    return log_entry
+
 
-    return COLUMNS_FILE
+# =============================================================================
+# PROFILING
+# =============================================================================
+PROFILE_MARKER = "PROFILE: "   # script.py links these files from debug_pipeline.log
+PROFILE_TOP = 25               # functions / allocation sites listed in the report
+
+
+def profile_run(user_text, top=PROFILE_TOP, **kwargs):
+    """
+    Run run_pipeline() under cProfile and tracemalloc.
+
+    Saves <log>.prof (for pstats or snakeviz) and <log>_alloc.txt (peak memory,
+    top allocation sites and top functions by cumulative time) next to the
+    run's JSON log, and prints their paths on PROFILE lines. Tables processed
+    in the process pool (several models) are not covered, only this process.
+
+    cProfile only sees the thread that enabled it, so the tables are loaded
+    on this thread instead of being prefetched while parsing. Allocation
+    sites are the memory the run still holds at the end compared with its
+    start (peak memory covers what was freed in between).
+
+    Args:
+        user_text: Natural language request
+        top: Number of functions and allocation sites in the report
+        **kwargs: Passed on to run_pipeline() (prefetch_tables is always False)
+
+    Returns:
+        The run log entry, with a "profile" section
+    """
+    kwargs["prefetch_tables"] = False
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        log_entry = run_pipeline(user_text, **kwargs)
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    stem = os.path.splitext(log_entry["log_file"])[0]
+    prof_path = stem + ".prof"
+    profiler.dump_stats(prof_path)
+
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ]
+    growth = snapshot.filter_traces(ignore).compare_to(start.filter_traces(ignore), "lineno")
+    lines = ["Peak traced memory: {:.1f} MB".format(peak / 1e6), "",
+             "Top {} allocation sites (memory held at the end of the run, compared with its start):".format(top)]
+    lines += [str(stat) for stat in growth[:top]]
+    stats_text = io.StringIO()
+    pstats.Stats(profiler, stream=stats_text).sort_stats("cumulative").print_stats(top)
+    lines += ["", "Top {} functions by cumulative time:".format(top), stats_text.getvalue()]
+    alloc_path = stem + "_alloc.txt"
+    with open(alloc_path, "w") as f:
+        f.write("\n".join(lines))
+
+    # Link the reports from the run's JSON log as well
+    log_entry["profile"] = {"prof_file": prof_path, "alloc_file": alloc_path,
+                            "peak_memory_mb": round(peak / 1e6, 2)}
+    with open(log_entry["log_file"], "w") as f:
+        json.dump({k: v for k, v in log_entry.items() if k != "log_file"}, f, indent=2)
+
+    print(PROFILE_MARKER + prof_path)
+    print(PROFILE_MARKER + alloc_path)
+    return log_entry
 
 
 # =============================================================================
 # MAIN
 # =============================================================================
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="ColumnsAI pipeline")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="preview the changes without writing a backup or the CSV")
+    parser.add_argument("--tables", nargs="+", metavar="CSV",
+                        help="column tables to apply the prompt to (default: columns.csv); "
+                             "several tables are processed in parallel")
+    parser.add_argument("--await-confirm", action="store_true",
+                        help="parse and compute the changes, then wait for 'commit' or 'abort' "
+                             "on stdin before writing anything")
+    parser.add_argument("--profile", action="store_true",
+                        help="run under cProfile and tracemalloc; saves a .prof file and an "
+                             "allocation report next to the JSON log")
+    args = parser.parse_args()
+
+    # script.py streams stdout into its progress window, so don't hold lines back
+    sys.stdout.reconfigure(line_buffering=True)
+
     try:
         with open(PROMPT_FILE, "r") as f:
             user_input = f.read().strip()
         print("Prompt: {}\n".format(user_input))
-        run_pipeline(user_input)
+        run = profile_run if args.profile else run_pipeline
+        run(user_input, dry_run=args.dry_run, table_paths=args.tables,
+            confirm=confirm_from_stdin if args.await_confirm else None)
     except Exception as e:
         print("\nFATAL ERROR: {}".format(e))
         import traceback
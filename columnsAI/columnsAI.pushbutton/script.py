@@ -2,13 +2,24 @@
 # This script launches a chat window to get user input for column modifications,
 # runs the AI pipeline, and archives the conversation history.
 
-from pyrevit import revit, DB, forms
+# Keep this engine alive: columns.py hooks DocumentChanged for its element cache
+__persistentengine__ = True
+
+from pyrevit import revit, forms
 import os
 import sys
+import json
 import shutil
 import subprocess
+import threading
+import time
 from datetime import datetime
 
+try:
+    import Queue
+except ImportError:  # CPython 3 engine
+    import queue as Queue
+
 # Get script directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -17,7 +28,9 @@ USER_INPUT_FILE = os.path.join(SCRIPT_DIR, "user_input.txt")
 INPUT_HISTORY_DIR = os.path.join(SCRIPT_DIR, "input_history")
 RUN_PIPELINE_SCRIPT = os.path.join(SCRIPT_DIR, "run_pipeline.py")
 COLUMNS_CSV = os.path.join(SCRIPT_DIR, "columns.csv")
-SYNC_SCRIPT = os.path.join(SCRIPT_DIR, "python_scripts", "columns.py")
+PYTHON_SCRIPTS_DIR = os.path.join(SCRIPT_DIR, "python_scripts")
+MANIFEST_FILE = os.path.join(SCRIPT_DIR, "model_manifest.json")
+UNCHANGED_FILE = os.path.join(SCRIPT_DIR, "unchanged_runs.json")   # written by run_pipeline.py
 
 # Ensure directories exist
 if not os.path.exists(INPUT_HISTORY_DIR):
@@ -80,142 +93,360 @@ def clear_user_input():
         return False
 
 
-def run_pipeline():
+def load_column_sync():
     """
-    Execute the run_pipeline.py script using external Python (not IronPython).
+    Import the columns.py sync module. It is imported (not exec'd) so its
+    element lookups stay cached for the Revit session between runs.
+    """
+    if PYTHON_SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, PYTHON_SCRIPTS_DIR)
+    import columns as column_sync
+    return column_sync
 
-    Returns:
-        True if successful, False otherwise
+
+def load_category_sync():
+    """Import the category_sync.py module (payloads of several element categories)."""
+    load_column_sync()
+    import category_sync
+    return category_sync
+
+
+def export_model_manifest():
     """
-    error_log = []
+    Export the levels / grids / family types of the open model so the
+    pipeline can validate changes without Revit.
 
+    Returns:
+        Manifest hash, or None if the export failed
+    """
     try:
-        error_log.append("Starting run_pipeline()")
-        error_log.append("SCRIPT_DIR: {}".format(SCRIPT_DIR))
-        error_log.append("RUN_PIPELINE_SCRIPT: {}".format(RUN_PIPELINE_SCRIPT))
-
-        # Find Python executable
-        python_exe = None
-
-        # Try common Python locations (full paths first, then PATH)
-        possible_pythons = [
-            r"C:\Users\{}\AppData\Local\Programs\Python\Python313\python.exe".format(os.environ.get("USERNAME", "")),
-            r"C:\Users\{}\AppData\Local\Programs\Python\Python312\python.exe".format(os.environ.get("USERNAME", "")),
-            r"C:\Users\{}\AppData\Local\Programs\Python\Python311\python.exe".format(os.environ.get("USERNAME", "")),
-            r"C:\Users\{}\AppData\Local\Programs\Python\Python310\python.exe".format(os.environ.get("USERNAME", "")),
-            r"C:\Users\{}\AppData\Local\Programs\Python\Python39\python.exe".format(os.environ.get("USERNAME", "")),
-            r"C:\Python313\python.exe",
-            r"C:\Python312\python.exe",
-            r"C:\Python311\python.exe",
-            r"C:\Python310\python.exe",
-            r"C:\Python39\python.exe",
-            "python",  # System PATH (last resort)
-            "python3",
-        ]
-
-        error_log.append("Searching for Python...")
-        for py in possible_pythons:
-            try:
-                error_log.append("Trying: {}".format(py))
-                # Check if file exists for full paths
-                if py.startswith("C:") and not os.path.isfile(py):
-                    error_log.append("Not found: {}".format(py))
-                    continue
-
-                # Test if this python works and has pandas
-                test_result = subprocess.call(
-                    [py, "-c", "import pandas"],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    shell=False
-                )
-                if test_result == 0:
-                    python_exe = py
-                    error_log.append("Found Python with pandas: {}".format(py))
-                    print("Found Python with pandas: {}".format(py))
-                    break
-                else:
-                    error_log.append("Python found but pandas not available: {}".format(py))
-            except Exception as e:
-                error_log.append("Failed {}: {}".format(py, str(e)))
+        return load_column_sync().export_manifest(revit.doc, MANIFEST_FILE)
+    except Exception as e:
+        print("Could not export model manifest: {}".format(e))
+        return None
+
+
+_PYTHON_EXE = None
+
+
+def find_python(error_log):
+    """
+    Locate an external Python (not IronPython) that has pandas installed.
+    The result is remembered so Preview and OK only search once.
+
+    Args:
+        error_log: List that search progress is appended to
+
+    Returns:
+        Path/command of the Python executable, or None if none was found
+    """
+    global _PYTHON_EXE
+    if _PYTHON_EXE:
+        return _PYTHON_EXE
+
+    python_exe = None
+
+    # Try common Python locations (full paths first, then PATH)
+    possible_pythons = [
+        r"C:\Users\{}\AppData\Local\Programs\Python\Python313\python.exe".format(os.environ.get("USERNAME", "")),
+        r"C:\Users\{}\AppData\Local\Programs\Python\Python312\python.exe".format(os.environ.get("USERNAME", "")),
+        r"C:\Users\{}\AppData\Local\Programs\Python\Python311\python.exe".format(os.environ.get("USERNAME", "")),
+        r"C:\Users\{}\AppData\Local\Programs\Python\Python310\python.exe".format(os.environ.get("USERNAME", "")),
+        r"C:\Users\{}\AppData\Local\Programs\Python\Python39\python.exe".format(os.environ.get("USERNAME", "")),
+        r"C:\Python313\python.exe",
+        r"C:\Python312\python.exe",
+        r"C:\Python311\python.exe",
+        r"C:\Python310\python.exe",
+        r"C:\Python39\python.exe",
+        "python",  # System PATH (last resort)
+        "python3",
+    ]
+
+    error_log.append("Searching for Python...")
+    for py in possible_pythons:
+        try:
+            error_log.append("Trying: {}".format(py))
+            # Check if file exists for full paths
+            if py.startswith("C:") and not os.path.isfile(py):
+                error_log.append("Not found: {}".format(py))
                 continue
 
-        if not python_exe:
-            error_log.append("ERROR: No Python found!")
+            # Test if this python works and has pandas
+            test_result = subprocess.call(
+                [py, "-c", "import pandas"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                shell=False
+            )
+            if test_result == 0:
+                python_exe = py
+                error_log.append("Found Python with pandas: {}".format(py))
+                print("Found Python with pandas: {}".format(py))
+                break
+            else:
+                error_log.append("Python found but pandas not available: {}".format(py))
+        except Exception as e:
+            error_log.append("Failed {}: {}".format(py, str(e)))
+            continue
+
+    _PYTHON_EXE = python_exe
+    return python_exe
+
+
+DEBUG_LOG_FILE = os.path.join(SCRIPT_DIR, "debug_pipeline.log")
+
+# Run the pipeline under cProfile / tracemalloc (run_pipeline.py --profile).
+# The .prof file and allocation report are saved next to the run's JSON log
+# and linked from debug_pipeline.log.
+PROFILE_PIPELINE = False
+
+# Line prefixes printed by run_pipeline.py
+STAGE_MARKER = "STAGE: "
+CONFIRM_MARKER = "AWAITING_CONFIRM"
+PROFILE_MARKER = "PROFILE: "
+NO_CHANGES_MARKER = "NO_CHANGES: "
+
+
+class PipelineRun(object):
+    """
+    A running run_pipeline.py process.
+
+    stdout and stderr are read line by line on background threads, so the
+    process never stalls on a full pipe and its output can be shown while it
+    runs. poll() hands the lines read so far to the UI thread.
+    """
+
+    def __init__(self, process, error_log):
+        self.process = process
+        self.error_log = error_log
+        self.started = time.time()
+        self.stdout = []
+        self.stderr = []
+        self.stage = "Starting"
+        self.writing = False    # a "Writing" stage was seen (stays set for the rest of the run)
+        self.last_line = ""
+        self.cancelled = False
+        self._lines = Queue.Queue()
+        self._readers = [self._read(process.stdout, self.stdout),
+                         self._read(process.stderr, self.stderr)]
+
+    def _read(self, pipe, sink):
+        def read():
+            for raw in iter(pipe.readline, b""):
+                self._lines.put((sink, raw.decode("utf-8", "ignore").rstrip("\r\n")))
+            pipe.close()
+        reader = threading.Thread(target=read)
+        reader.daemon = True
+        reader.start()
+        return reader
+
+    def reply(self, answer):
+        """Answer a run started with await_confirm ("commit" or "abort")."""
+        self.error_log.append("Reply to speculative run: {}".format(answer))
+        try:
+            self.process.stdin.write((answer + "\n").encode("utf-8"))
+            self.process.stdin.close()
+        except (IOError, OSError, ValueError) as e:
+            # The run already ended (e.g. parsing failed); its output says why
+            self.error_log.append("Could not send reply: {}".format(e))
+
+    def poll(self):
+        """Collect the output read so far; updates stage and last_line."""
+        while True:
+            try:
+                sink, line = self._lines.get_nowait()
+            except Queue.Empty:
+                break
+            sink.append(line)
+            if sink is self.stdout and line:
+                if line.startswith(STAGE_MARKER):
+                    self.stage = line[len(STAGE_MARKER):]
+                    if self.stage.startswith("Writing"):
+                        self.writing = True
+                elif line != CONFIRM_MARKER:
+                    self.last_line = line
+
+    def done(self):
+        return self.process.poll() is not None and not any(r.is_alive() for r in self._readers)
+
+    def elapsed(self):
+        return time.time() - self.started
+
+    def cancel(self):
+        """Kill the worker. Nothing has been written unless it reached "Writing"."""
+        if self.process.poll() is None:
+            self.cancelled = True
+            self.error_log.append("Cancelled by user at stage: {}".format(self.stage))
+            try:
+                self.process.kill()
+            except OSError:
+                pass
+
+    def can_cancel(self):
+        # Once the pipeline writes a CSV, killing it could leave the table
+        # changed but not synced, even if a later table is still being checked
+        return not self.writing
+
+    def wait(self):
+        """Block until the process has exited and all its output is read."""
+        self.process.wait()
+        for reader in self._readers:
+            reader.join()
+        self.poll()
+
+
+def write_debug_log(text):
+    """Write debug_pipeline.log on a background thread; the result is only for diagnosis."""
+    def write():
+        try:
+            with open(DEBUG_LOG_FILE, "w") as f:
+                f.write(text)
+        except Exception as e:
+            print("Failed to write debug log: {}".format(e))
+    writer = threading.Thread(target=write)
+    writer.daemon = True
+    writer.start()
+    return writer
+
+
+def start_pipeline(error_log, dry_run=False, await_confirm=False):
+    """
+    Launch run_pipeline.py with external Python (not IronPython) without
+    waiting for it. Reads user_input.txt, so save the input first.
+
+    Args:
+        error_log: List that progress is appended to
+        dry_run: Only preview the changes (no backup, no CSV write)
+        await_confirm: Parse and compute the changes, then wait for
+                       PipelineRun.reply() before writing
+
+    Returns:
+        PipelineRun, or None if no Python was found
+    """
+    error_log.append("Starting run_pipeline()")
+    error_log.append("SCRIPT_DIR: {}".format(SCRIPT_DIR))
+    error_log.append("RUN_PIPELINE_SCRIPT: {}".format(RUN_PIPELINE_SCRIPT))
+
+    # Find Python executable
+    python_exe = find_python(error_log)
+
+    if not python_exe:
+        error_log.append("ERROR: No Python found!")
+        return None
+
+    # Let the pipeline validate against the current model
+    manifest_hash = export_model_manifest()
+    error_log.append("Model manifest: {}".format(manifest_hash))
+
+    # Run the pipeline script with external Python
+    error_log.append("Starting pipeline execution...")
+    print("Running AI pipeline with external Python...")
+    print("Python: {}".format(python_exe))
+    print("Script: {}".format(RUN_PIPELINE_SCRIPT))
+
+    command = [python_exe, RUN_PIPELINE_SCRIPT]
+    if dry_run:
+        command.append("--dry-run")
+    if await_confirm:
+        command.append("--await-confirm")
+    if PROFILE_PIPELINE:
+        command.append("--profile")
+
+    process = subprocess.Popen(
+        command,
+        stdin=subprocess.PIPE if await_confirm else None,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        cwd=SCRIPT_DIR,
+        shell=False
+    )
+    return PipelineRun(process, error_log)
+
+
+def run_pipeline(dry_run=False, run=None, reply=None):
+    """
+    Execute the run_pipeline.py script using external Python (not IronPython),
+    or finish a speculative run launched earlier with start_pipeline().
+
+    The output is shown live in a progress window that can cancel the run.
+
+    Args:
+        dry_run: Only preview the changes (no backup, no CSV write)
+        run: Speculative run from start_pipeline(await_confirm=True)
+        reply: Answer for the speculative run: "commit" (a run the user declines is killed with cancel())
+
+    Returns:
+        Pipeline stdout if successful, None otherwise
+    """
+    error_log = run.error_log if run is not None else []
+
+    try:
+        if run is None:
+            run = start_pipeline(error_log, dry_run=dry_run)
+
+        if run is None:
             forms.alert(
                 "Could not find Python installation!\n\n"
                 "Please install Python 3.9+ from python.org\n"
                 "and make sure it's in your system PATH.",
                 title="Python Not Found"
             )
-            return False
+            return None
 
-        # Run the pipeline script with external Python
-        error_log.append("Starting pipeline execution...")
-        print("Running AI pipeline with external Python...")
-        print("Python: {}".format(python_exe))
-        print("Script: {}".format(RUN_PIPELINE_SCRIPT))
-
-        process = subprocess.Popen(
-            [python_exe, RUN_PIPELINE_SCRIPT],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            cwd=SCRIPT_DIR,
-            shell=False
-        )
+        if reply:
+            run.reply(reply)
+        PipelineProgressWindow(run, "ColumnsAI - Preview" if dry_run else "ColumnsAI - Pipeline").ShowDialog()
+        run.wait()
 
-        stdout, stderr = process.communicate()
+        returncode = run.process.returncode
+        stdout = "\n".join(run.stdout)
+        stderr = "\n".join(run.stderr)
 
-        error_log.append("Pipeline completed with return code: {}".format(process.returncode))
+        error_log.append("Pipeline completed with return code: {} in {:.1f}s".format(returncode, run.elapsed()))
+        profile_files = [line[len(PROFILE_MARKER):] for line in run.stdout if line.startswith(PROFILE_MARKER)]
 
         # Write debug log
-        debug_log_path = os.path.join(SCRIPT_DIR, "debug_pipeline.log")
-        try:
-            with open(debug_log_path, "w") as f:
-                f.write("=== Pipeline Execution Debug Log ===\n")
-                f.write("Return code: {}\n\n".format(process.returncode))
-                f.write("=== ERROR LOG ===\n")
-                f.write("\n".join(error_log))
-                f.write("\n\n=== STDOUT ===\n")
-                f.write(stdout.decode('utf-8', errors='ignore'))
-                f.write("\n\n=== STDERR ===\n")
-                f.write(stderr.decode('utf-8', errors='ignore'))
-            error_log.append("Debug log written to: {}".format(debug_log_path))
-        except Exception as log_error:
-            error_log.append("Failed to write debug log: {}".format(str(log_error)))
+        write_debug_log(
+            "=== Pipeline Execution Debug Log ===\n"
+            "Return code: {}\n\n"
+            "{}"
+            "=== ERROR LOG ===\n{}"
+            "\n\n=== STDOUT ===\n{}"
+            "\n\n=== STDERR ===\n{}".format(
+                returncode,
+                "=== PROFILE ===\n{}\n\n".format("\n".join(profile_files)) if profile_files else "",
+                "\n".join(error_log), stdout, stderr))
 
         # Print output
         if stdout:
             print("\n=== Pipeline Output ===")
-            print(stdout.decode('utf-8', errors='ignore'))
+            print(stdout)
 
         if stderr:
             print("\n=== Pipeline Errors ===")
-            print(stderr.decode('utf-8', errors='ignore'))
+            print(stderr)
+
+        if run.cancelled:
+            print("Pipeline cancelled at stage: {}".format(run.stage))
+            return None
 
-        if process.returncode != 0:
+        if returncode != 0:
             # Write error log before showing alert
             error_summary = "\n".join(error_log[-10:])
             forms.alert(
                 "Pipeline failed with error code: {}\n\nLast 10 log entries:\n{}".format(
-                    process.returncode, error_summary
+                    returncode, error_summary
                 ),
                 title="Pipeline Error"
             )
-            return False
+            return None
 
-        return True
+        return stdout
 
     except Exception as e:
         error_log.append("EXCEPTION: {}".format(str(e)))
         # Try to write error log
-        try:
-            debug_log_path = os.path.join(SCRIPT_DIR, "debug_pipeline.log")
-            with open(debug_log_path, "w") as f:
-                f.write("=== EXCEPTION LOG ===\n")
-                f.write("\n".join(error_log))
-        except:
-            pass
+        write_debug_log("=== EXCEPTION LOG ===\n" + "\n".join(error_log))
 
         forms.alert(
             "Pipeline execution failed!\n\nError: {}\n\nType: {}\n\nLog:\n{}".format(
@@ -225,55 +456,191 @@ def run_pipeline():
         )
         import traceback
         print(traceback.format_exc())
-        return False
+        return None
+
+
+def extract_preview(output):
+    """Return the preview block printed by a dry run of the pipeline."""
+    start = output.find("=== PREVIEW ===")
+    end = output.find("=== END PREVIEW ===")
+    if start < 0 or end < 0:
+        return output.strip() or "No preview produced."
+    return output[start + len("=== PREVIEW ==="):end].strip()
 
 
-def sync_columns_with_revit():
+def extract_errors(output):
     """
-    Execute the columns.py script to sync the CSV with Revit.
+    Return the "Error ..." lines the pipeline printed, with their indented
+    detail lines (e.g. unknown type names and their closest candidates).
+    """
+    lines = []
+    detail = False
+    for line in (output or "").splitlines():
+        if line.startswith("Error"):
+            lines.append(line)
+            detail = True
+        elif detail and line.startswith("  "):
+            lines.append(line)
+        else:
+            detail = False
+    return "\n".join(lines)
+
+
+def extract_unchanged(output):
+    """
+    Tables of this model the pipeline left alone because the request
+    changes nothing in them (printed on NO_CHANGES lines).
+    """
+    tables = []
+    for line in (output or "").splitlines():
+        if line.startswith(NO_CHANGES_MARKER):
+            table = os.path.abspath(line[len(NO_CHANGES_MARKER):].strip())
+            if os.path.normcase(os.path.dirname(table)) == os.path.normcase(SCRIPT_DIR):
+                tables.append(table)
+    return tables
+
+
+def parse_sync_payloads(output):
+    """
+    Extract the changed rows the pipeline printed on its SYNC_PAYLOAD lines,
+    one line per table (columns.csv, beams.csv, ...).
+
+    Returns:
+        List of payload dicts whose "rows" are row dicts (same shape as
+        csv.DictReader rows); only tables of this model (next to this script)
+    """
+    get_category = load_category_sync().get_category
+    payloads = []
+    for line in (output or "").splitlines():
+        if line.startswith("SYNC_PAYLOAD: "):
+            payload = json.loads(line[len("SYNC_PAYLOAD: "):])
+            category = get_category(payload.get("category"))
+            own_table = os.path.join(SCRIPT_DIR, category.table)
+            # Multi-model runs also print payloads for other models' tables
+            table = payload.get("table") or own_table
+            if os.path.normcase(os.path.abspath(table)) != os.path.normcase(own_table):
+                continue
+            payload["table"] = own_table
+            fields = payload["fields"]
+            payload["rows"] = [dict(zip(fields, row)) for row in payload["rows"]]
+            payloads.append(payload)
+    return payloads
+
+
+def forget_unchanged(fingerprints):
+    """Drop run_pipeline's "unchanged" entries for these table fingerprints."""
+    prefixes = tuple("{}:".format(fp) for fp in fingerprints if fp)
+    if not prefixes or not os.path.isfile(UNCHANGED_FILE):
+        return
+    try:
+        with open(UNCHANGED_FILE, "r") as f:
+            keys = json.load(f)
+        kept = [k for k in keys if not k.startswith(prefixes)]
+        if len(kept) != len(keys):
+            with open(UNCHANGED_FILE, "w") as f:
+                json.dump(kept, f)
+    except Exception as e:
+        print("Could not update {}: {}".format(os.path.basename(UNCHANGED_FILE), e))
+
+
+def restore_tables(payloads):
+    """
+    Put back the tables of payloads whose sync did not commit.
+
+    The pipeline writes a table before it is synced; if the sync is rolled
+    back, interrupted or fails, the table is restored from the run's backup
+    so it matches the model again and a rerun finds the changes again.
+    """
+    for payload in payloads:
+        table = payload["table"]
+        backup = payload.get("backup_file")
+        if backup and os.path.isfile(backup):
+            shutil.copy2(backup, table)
+            print("Restored {} from {}".format(os.path.basename(table), backup))
+        else:
+            print("Could not restore {}: backup not found ({})".format(os.path.basename(table), backup))
+    forget_unchanged([p.get("fingerprint") for p in payloads])
+
+
+def restore_skipped_rows(payload, stats):
+    """
+    Put back the rows a committed sync skipped (type or grid not found, ...).
+
+    Their new values never reached the model, so the table must not keep
+    them: a rerun would find nothing to change and never retry them.
+    """
+    id_field = stats.get("id_field") or "column_id"
+    skipped = set((r.get(id_field) or "").strip() for r in payload["rows"]) - set(stats.get("ids") or {})
+    skipped.discard("")
+    backup = payload.get("backup_file")
+    if not skipped:
+        return
+    if not (backup and os.path.isfile(backup)):
+        print("Could not restore skipped rows of {}: backup not found ({})".format(
+            os.path.basename(payload["table"]), backup))
+        return
+    restored = load_column_sync().restore_rows(payload["table"], backup, skipped, id_field)
+    print("Restored {} skipped row(s) of {} from {}".format(restored, os.path.basename(payload["table"]), backup))
+    forget_unchanged([payload.get("fingerprint")])
+
+
+def sync_with_revit(payloads=None):
+    """
+    Sync the changes with Revit through the columns.py / category_sync.py modules.
+
+    Args:
+        payloads: Changed rows per table handed over by the pipeline, synced
+                  in one TransactionGroup (tables not committed are restored,
+                  see restore_tables, and so are rows a committed sync
+                  skipped, see restore_skipped_rows). If None, the whole columns.csv is
+                  read and synced.
 
     Returns:
         True if successful, False otherwise
     """
     try:
-        if not os.path.isfile(COLUMNS_CSV):
+        if payloads is None and not os.path.isfile(COLUMNS_CSV):
             forms.alert(
                 "Columns CSV not found!\n\nPath: {}".format(COLUMNS_CSV),
                 title="File Not Found"
             )
             return False
 
-        print("\nSyncing columns with Revit...")
+        column_sync = load_column_sync()
 
-        # Import and execute the columns sync script
-        sys.path.insert(0, os.path.join(SCRIPT_DIR, "python_scripts"))
-
-        # Read the columns.py script
-        with open(SYNC_SCRIPT, "r") as f:
-            code = f.read()
-
-        # Replace the file picker line with our CSV path
-        # Find: csv_path = forms.pick_file(file_ext="csv", title="Select columns CSV")
-        # Replace with: csv_path = r"OUR_PATH"
-        code = code.replace(
-            'csv_path = forms.pick_file(file_ext="csv", title="Select columns CSV")',
-            'csv_path = r"{}"'.format(COLUMNS_CSV)
-        )
-
-        # Execute in the current context with necessary imports
-        exec_globals = {
-            "__file__": SYNC_SCRIPT,
-            "revit": revit,
-            "DB": DB,
-            "forms": forms
-        }
-        exec(code, exec_globals)
+        if payloads is None:
+            print("\nSyncing columns with Revit...")
+            rows = column_sync.read_csv_rows(COLUMNS_CSV)
+            stats = column_sync.sync_rows(revit.doc, rows)
+            results = [({"table": COLUMNS_CSV}, stats)]
+        else:
+            print("\nSyncing {} with Revit...".format(", ".join(p.get("category", "columns") for p in payloads)))
+            try:
+                results = load_category_sync().sync_payloads(revit.doc, payloads)
+            except Exception:
+                restore_tables(payloads)
+                raise
+            committed = set(id(p) for p, stats in results if stats.get("outcome") == "committed")
+            restore_tables([p for p in payloads if id(p) not in committed])
+            for payload, stats in results:
+                if id(payload) in committed and stats.get("skipped"):
+                    restore_skipped_rows(payload, stats)
+
+        # Remember ElementIds so the next sync resolves elements without a Mark scan
+        for payload, stats in results:
+            try:
+                column_sync.write_back_ids(payload["table"], stats["ids"], stats["id_field"])
+            except Exception as e:
+                print("Could not record element ids in {}: {}".format(os.path.basename(payload["table"]), e))
+        report = "\n\n".join(column_sync.format_report(stats) for _, stats in results)
+        print(report)
+        forms.alert(report, title="Sync Complete")
 
         return True
 
     except Exception as e:
         forms.alert(
-            "Column sync failed!\n\nError: {}\n\nType: {}".format(
+            "Sync failed!\n\nError: {}\n\nType: {}".format(
                 str(e), type(e).__name__
             ),
             title="Sync Error"
@@ -293,8 +660,76 @@ try:
     clr.AddReference('PresentationCore')
     clr.AddReference('PresentationFramework')
     clr.AddReference('WindowsBase')
-    from System.Windows import Window, Thickness, TextWrapping, WindowStartupLocation
-    from System.Windows.Controls import TextBox, Button, StackPanel, Label, ScrollBarVisibility
+    from System import TimeSpan
+    from System.Windows import Window, Thickness, TextWrapping, WindowStartupLocation, SizeToContent
+    from System.Windows.Controls import TextBox, TextBlock, Button, StackPanel, Label, ScrollBarVisibility
+    from System.Windows.Threading import DispatcherTimer
+
+    class PipelineProgressWindow(Window):
+        """
+        Modal progress view of a PipelineRun: current stage, elapsed time and
+        the latest output line, refreshed by a timer while Revit keeps painting.
+        Cancel (or closing the window) kills the worker.
+        """
+        def __init__(self, run, title):
+            self.run = run
+            self.Title = title
+            self.Width = 500
+            self.SizeToContent = SizeToContent.Height
+            self.WindowStartupLocation = WindowStartupLocation.CenterScreen
+
+            panel = StackPanel()
+            panel.Margin = Thickness(20)
+
+            self.stage_label = Label()
+            self.stage_label.FontSize = 14
+            panel.Children.Add(self.stage_label)
+
+            self.elapsed_label = Label()
+            panel.Children.Add(self.elapsed_label)
+
+            self.output_text = TextBlock()
+            self.output_text.TextWrapping = TextWrapping.Wrap
+            self.output_text.Margin = Thickness(5, 0, 0, 20)
+            panel.Children.Add(self.output_text)
+
+            self.cancel_btn = Button()
+            self.cancel_btn.Content = "Cancel"
+            self.cancel_btn.Height = 35
+            self.cancel_btn.FontSize = 14
+            self.cancel_btn.Click += self.cancel_click
+            panel.Children.Add(self.cancel_btn)
+
+            self.Content = panel
+            self.Closing += self.on_closing
+
+            self.timer = DispatcherTimer()
+            self.timer.Interval = TimeSpan.FromMilliseconds(100)
+            self.timer.Tick += self.on_tick
+            self.timer.Start()
+            self.on_tick(None, None)
+
+        def on_tick(self, sender, e):
+            self.run.poll()
+            self.stage_label.Content = "Stage: {}".format(self.run.stage)
+            self.elapsed_label.Content = "Elapsed: {:.1f}s".format(self.run.elapsed())
+            self.output_text.Text = self.run.last_line
+            self.cancel_btn.IsEnabled = self.run.can_cancel()
+            if self.run.done():
+                self.timer.Stop()
+                self.Close()
+
+        def cancel_click(self, sender, e):
+            self.cancel_btn.IsEnabled = False
+            self.stage_label.Content = "Cancelling..."
+            self.run.cancel()
+
+        def on_closing(self, sender, e):
+            if not self.run.done():
+                if self.run.can_cancel():
+                    self.run.cancel()
+                else:
+                    e.Cancel = True
 
     class InputDialog(Window):
         def __init__(self):
@@ -323,6 +758,15 @@ try:
             self.textbox.Margin = Thickness(0, 0, 0, 20)
             panel.Children.Add(self.textbox)
 
+            # Preview Button (dry run: parse and diff only, nothing is written)
+            preview_btn = Button()
+            preview_btn.Content = "Preview"
+            preview_btn.Height = 35
+            preview_btn.FontSize = 14
+            preview_btn.Margin = Thickness(0, 0, 0, 10)
+            preview_btn.Click += self.preview_click
+            panel.Children.Add(preview_btn)
+
             # OK Button
             ok_btn = Button()
             ok_btn.Content = "OK"
@@ -338,6 +782,18 @@ try:
             self.user_input = self.textbox.Text
             self.Close()
 
+        def preview_click(self, sender, e):
+            text = (self.textbox.Text or "").strip()
+            if not text:
+                forms.alert("No input provided!")
+                return
+            if not save_user_input(text):
+                return
+
+            output = run_pipeline(dry_run=True)
+            if output is not None:
+                forms.alert(extract_preview(output), title="Preview - nothing has been changed")
+
     # Show dialog
     dialog = InputDialog()
     dialog.ShowDialog()
@@ -353,6 +809,22 @@ try:
     if not user_input:
         forms.alert("No input provided!", exitscript=True)
 
+    # Save user input to file
+    if not save_user_input(user_input):
+        forms.alert("Failed to save input. Aborting.", exitscript=True)
+
+    print("User input saved to: {}".format(USER_INPUT_FILE))
+
+    # Start the AI pipeline (external Python) before asking for confirmation:
+    # it parses the request and computes the changes while the dialog is open,
+    # then waits for the answer before writing anything
+    print("\nRunning AI pipeline...")
+    try:
+        speculative = start_pipeline([], await_confirm=True)
+    except Exception as e:
+        print("Could not start the pipeline early: {}".format(e))
+        speculative = None
+
     # Show confirmation
     proceed = forms.alert(
         "You entered:\n\n\"{}\"\n\nProceed with processing?".format(user_input),
@@ -362,43 +834,79 @@ try:
     )
 
     if not proceed:
+        if speculative is not None:
+            # Nothing is written before the go-ahead, so kill the run instead of
+            # waiting (without a window) for the parse to reach the confirmation
+            speculative.cancel()
         forms.alert("Operation cancelled.", exitscript=True)
 
-    # Save user input to file
-    if not save_user_input(user_input):
-        forms.alert("Failed to save input. Aborting.", exitscript=True)
-
-    print("User input saved to: {}".format(USER_INPUT_FILE))
-
-    # Run the AI pipeline (external Python)
-    print("\nRunning AI pipeline...")
-    if not run_pipeline():
+    if speculative is not None:
+        pipeline_output = run_pipeline(run=speculative, reply="commit")
+    else:
+        pipeline_output = run_pipeline()
+    if pipeline_output is None:
+        if speculative is not None and speculative.cancelled:
+            forms.alert("Operation cancelled.", exitscript=True)
         forms.alert("Pipeline execution failed. Check console for details.", exitscript=True)
 
-    print("\nPipeline completed successfully!")
+    payloads = parse_sync_payloads(pipeline_output)
+    changed = [p for p in payloads if p["rows"]]
+    errors = extract_errors(pipeline_output)
+    unchanged = extract_unchanged(pipeline_output)
+    if errors and not payloads:
+        # Nothing was written (e.g. rejected by the model manifest); keep the input for another try
+        forms.alert(errors, title="Changes Rejected", exitscript=True)
+
+    if errors:
+        # Some tables failed while others were written (e.g. beams rejected,
+        # columns changed): sync the written ones, keep the input for another try
+        print("\nPipeline completed with errors.")
+        forms.alert(
+            "{}\n\nThe other tables were changed and will be synced. The input is kept, "
+            "so the rejected part can be fixed and run again.".format(errors),
+            title="Some Changes Rejected"
+        )
+    else:
+        print("\nPipeline completed successfully!")
 
-    # Archive the input
-    archive_path = archive_input(user_input)
-    if archive_path:
-        print("Input archived to: {}".format(archive_path))
+        # Archive the input
+        archive_path = archive_input(user_input)
+        if archive_path:
+            print("Input archived to: {}".format(archive_path))
 
-    # Clear user_input.txt
-    if clear_user_input():
-        print("user_input.txt cleared.")
+        # Clear user_input.txt
+        if clear_user_input():
+            print("user_input.txt cleared.")
 
     # Now sync the modified CSV with Revit
     print("\n" + "="*50)
     print("Syncing modified CSV with Revit...")
     print("="*50)
 
-    if not sync_columns_with_revit():
-        forms.alert("Column sync failed. Check console for details.", exitscript=True)
+    if unchanged and not changed and not errors:
+        # Rerun of a request that is already applied: nothing was written or backed up.
+        # Only the tables were checked; rows a sync skipped were put back, so they differ.
+        print("No changes - {} already match the request, nothing to sync.".format(
+            ", ".join(os.path.basename(t) for t in unchanged)))
+        forms.alert("No changes: {} already match this request.".format(
+            ", ".join(os.path.basename(t) for t in unchanged)), title="No Changes", exitscript=True)
+    if payloads and not changed:
+        print("No rows changed - nothing to sync.")
+    elif not sync_with_revit(changed if payloads else None):
+        forms.alert("Sync failed. Check console for details.", exitscript=True)
 
     # Show success message
-    forms.alert(
-        "ColumnsAI completed successfully!\n\nYour column modifications have been processed and synced with Revit.",
-        title="Success"
-    )
+    if errors:
+        forms.alert(
+            "ColumnsAI completed with errors.\n\nThe changed tables were synced with Revit; "
+            "these were not changed:\n\n{}".format(errors),
+            title="Completed With Errors"
+        )
+    else:
+        forms.alert(
+            "ColumnsAI completed successfully!\n\nYour column modifications have been processed and synced with Revit.",
+            title="Success"
+        )
 
     print("\n" + "="*50)
     print("ColumnsAI execution complete!")